@@ -1,12 +1,18 @@
 from flask import Flask, request, send_file, jsonify
 import os
+import shutil
 import subprocess
+import tempfile
 import uuid
+from io import BytesIO
 from flask_cors import CORS
 
 app = Flask(__name__)
 CORS(app)  # Allow all domains
 
+# Write the .tex copy and pdflatex output next to each job, and keep the job directory
+DEBUG_ARTIFACTS = os.environ.get("DEBUG_ARTIFACTS", "0") == "1"
+
 @app.route("/")
 def home():
     return "Welcome to Rizzume - Resume Generator API!"
@@ -32,11 +38,9 @@ def escape_latex(text):
     return text
 
 def generate_pdf(latex_content):
+    """Compile in a throwaway directory and return the PDF bytes, or None"""
+    pdf_directory = tempfile.mkdtemp(prefix="rizzume_")
     try:
-        pdf_directory = "D:/Downloads/Projects/vs code/Rizzume"
-        if not os.path.exists(pdf_directory):
-            os.makedirs(pdf_directory)
-
         unique_id = str(uuid.uuid4())[:8]
         base_filename = f"resume_{unique_id}"
         tex_filename = f"{base_filename}.tex"
@@ -49,33 +53,31 @@ def generate_pdf(latex_content):
         with open(tex_file_path, 'w', encoding='utf-8') as latex_file:
             latex_file.write(latex_content)
 
-        # Save a debug copy
-        debug_path = os.path.join(pdf_directory, "debug_latest.tex")
-        with open(debug_path, 'w', encoding='utf-8') as debug_file:
-            debug_file.write(latex_content)
-
-        original_dir = os.getcwd()
-        os.chdir(pdf_directory)
+        # Explicit output directory and a per-child cwd instead of os.chdir,
+        # which is process-global and races between concurrent requests
+        cmd = ["pdflatex", "-interaction=nonstopmode", f"-output-directory={pdf_directory}", tex_file_path]
+        result = subprocess.run(cmd, cwd=pdf_directory, capture_output=True, text=True)
 
-        try:
-            cmd = ["pdflatex", "-interaction=nonstopmode", tex_filename]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-
-            with open(os.path.join(pdf_directory, "pdflatex_output.log"), "w") as log:
+        if DEBUG_ARTIFACTS:
+            with open(os.path.join(pdf_directory, f"{base_filename}_pdflatex_output.log"), "w") as log:
                 log.write(f"COMMAND: {' '.join(cmd)}\n\n")
                 log.write(f"STDOUT:\n{result.stdout}\n\n")
                 log.write(f"STDERR:\n{result.stderr}\n\n")
                 log.write(f"RETURN CODE: {result.returncode}\n")
 
-            if os.path.exists(pdf_file_path):
-                return pdf_file_path
-            else:
-                return None
-        finally:
-            os.chdir(original_dir)
+        if os.path.exists(pdf_file_path):
+            with open(pdf_file_path, "rb") as pdf_file:
+                return pdf_file.read()
+        else:
+            return None
     except Exception as e:
         print(f"Error generating PDF: {e}")
         return None
+    finally:
+        if DEBUG_ARTIFACTS:
+            print(f"Kept job directory: {pdf_directory}")
+        else:
+            shutil.rmtree(pdf_directory, ignore_errors=True)
 
 @app.route("/generate-pdf", methods=["POST"])
 def generate_resume():
@@ -233,10 +235,10 @@ def generate_resume():
 \end{document}
 """
 
-        pdf_path = generate_pdf(latex_content)
+        pdf_content = generate_pdf(latex_content)
 
-        if pdf_path and os.path.exists(pdf_path):
-            return send_file(pdf_path, as_attachment=True, download_name="resume.pdf")
+        if pdf_content:
+            return send_file(BytesIO(pdf_content), mimetype="application/pdf", as_attachment=True, download_name="resume.pdf")
         else:
             return jsonify({"error": "Failed to generate PDF"}), 500
 
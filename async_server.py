@@ -0,0 +1,448 @@
+"""Async serving mode: python async_server.py
+
+An aiohttp front end over the same validation, templates, cache and metrics
+as main.py. A waiting request is a suspended coroutine rather than a blocked
+thread, so one process can hold hundreds of them; an asyncio.Semaphore of
+MAX_CONCURRENT_COMPILES decides how many TeX processes actually run.
+
+Compiles start with asyncio.create_subprocess_exec in their own process
+group under the sandbox resource limits, and the group is killed outright
+on timeout. File reads and cache writes run
+in the default executor so the event loop never waits on the disk. Identical
+in-flight documents share one compile, as on the Flask queue.
+
+The Flask app in main.py stays the default (Procfile). This mode serves
+POST /generate-pdf and GET /pdf/<digest> without Range support, plus
+/health/live, /health/ready and /metrics; the job, preview and debug
+endpoints are Flask only. Parked warm
+pdflatex workers are not used here (they are driven through blocking pipes),
+so PDFLATEX_POOL_SIZE defaults to 0. Requests are traced like the Flask
+ones (X-Trace-Id, spans in TRACE_FILE), but per-request and window
+profiling are Flask only.
+"""
+import os
+import uuid
+import asyncio
+import logging
+import traceback
+
+from aiohttp import web
+from werkzeug.http import parse_etags
+
+# Before main is imported: its setup would otherwise park pdflatex workers
+# this mode never hands work to
+os.environ.setdefault('PDFLATEX_POOL_SIZE', '0')
+
+import main  # noqa: E402
+import pdf_optimize  # noqa: E402
+import sandbox  # noqa: E402
+import autofit  # noqa: E402
+import tracing  # noqa: E402
+from main import (  # noqa: E402
+    ENGINES, HTML, PDF_CACHE_ENABLED, PDF_JOB_WAIT_TIMEOUT, MAX_CONCURRENT_COMPILES, USE_LATEX_FORMAT,
+    DEBUG_ARTIFACTS, RESULTS_DIR, COMPILES, COMPILES_IN_FLIGHT, RENDER_SECONDS, stage,
+    PDF_SIZE_BYTES, HTTP_REQUESTS, REJECTED,
+)
+from validation import ValidationError, DEFAULT_LIMITS, validate_request_size  # noqa: E402
+from latex_log import summarize_latex_errors  # noqa: E402
+from metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE  # noqa: E402
+
+logger = logging.getLogger('rizzume')
+
+COMPILE_TIMEOUT = 30
+# Requests allowed to wait for a compile slot before new ones get a 503
+ASYNC_MAX_PENDING = int(os.environ.get('ASYNC_MAX_PENDING', 512))
+
+ASYNC_PENDING = REGISTRY.gauge('rizzume_async_pending_compiles', 'Async requests waiting for or holding a compile slot')
+ASYNC_COALESCED = REGISTRY.counter('rizzume_async_coalesced_total', 'Async requests that joined an identical in-flight compile')
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def write_file(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def write_bytes(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class AsyncCompiler:
+    """Runs compiles as asyncio subprocesses, at most `limit` at a time"""
+
+    def __init__(self, limit, max_pending):
+        self.limit = limit
+        self.max_pending = max_pending
+        self._slots = None
+        self._inflight = {}
+        self._pending = 0
+
+    def busy(self):
+        return self._pending >= self.max_pending
+
+    def pending(self):
+        return self._pending
+
+    def running(self, etag):
+        return etag in self._inflight
+
+    async def pdf_bytes(self, document, etag):
+        """PDF content for a document, joining an identical compile if one is running"""
+        task = self._inflight.get(etag)
+        if task is not None:
+            ASYNC_COALESCED.inc()
+        else:
+            task = asyncio.ensure_future(self._compile(document, etag))
+            self._inflight[etag] = task
+            task.add_done_callback(lambda _: self._inflight.pop(etag, None))
+        # Shielded so one client disconnecting does not cancel everyone's compile
+        return await asyncio.shield(task)
+
+    async def fitted_pdf_bytes(self, document, etag):
+        """pdf_bytes for a one-page auto-fit document; see main.compile_fitted_pdf"""
+        loop = asyncio.get_running_loop()
+        search = autofit.search(main.fitted_levels.get(document.fit_key) or 0)
+        candidates = {}
+        pages = {}
+        try:
+            level = next(search)
+            while True:
+                candidate = main.fit_candidate(document, level)
+                candidate_etag = main.pdf_etag(candidate)
+                cached = await loop.run_in_executor(None, main.lookup_cached_pdf, candidate_etag)
+                if cached:
+                    content = cached.content or await loop.run_in_executor(None, read_file, cached.path)
+                else:
+                    content = await self.pdf_bytes(candidate, candidate_etag)
+                if not content:
+                    return None
+                candidates[level] = content
+                pages[level] = autofit.pdf_pages(content)
+                if pages[level] is None:
+                    logger.warning(f"Auto-fit could not count the pages of level {level}, stopping there")
+                    break
+                level = search.send(pages[level])
+        except StopIteration as stop:
+            level = stop.value
+        main.record_fit(document, level, pages[level], len(candidates))
+
+        content = candidates[level]
+        if document.optimize != pdf_optimize.OFF and pdf_optimize.available():
+            path = os.path.join(RESULTS_DIR, f"{uuid.uuid4().hex}.pdf")
+            await loop.run_in_executor(None, write_bytes, path, content)
+            try:
+                with stage('optimize'):
+                    await self._optimize(path, document.optimize)
+                content = await loop.run_in_executor(None, read_file, path)
+            finally:
+                await loop.run_in_executor(None, discard, path)
+        if PDF_CACHE_ENABLED:
+            await loop.run_in_executor(None, main.pdf_cache.put, etag, content)
+        return content
+
+    async def _compile(self, document, etag):
+        if self._slots is None:
+            # Created on first use so it belongs to the running loop
+            self._slots = asyncio.Semaphore(self.limit)
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        ASYNC_PENDING.inc()
+        try:
+            async with self._slots:
+                output_path = os.path.join(RESULTS_DIR, f"{uuid.uuid4().hex}.pdf")
+                engine = ENGINES[document.engine]
+                with RENDER_SECONDS.time(engine=engine.name):
+                    if engine.source_type == HTML:
+                        # WeasyPrint is in-process; a thread keeps the loop free
+                        done = await loop.run_in_executor(
+                            None, main.generate_html_pdf, document.source, output_path, engine)
+                    else:
+                        done = await self._compile_latex(document.source, output_path, engine)
+                if not done:
+                    return None
+                if document.optimize != pdf_optimize.OFF and pdf_optimize.available():
+                    with stage('optimize'):
+                        await self._optimize(output_path, document.optimize)
+        finally:
+            self._pending -= 1
+            ASYNC_PENDING.dec()
+
+        if PDF_CACHE_ENABLED:
+            path = await loop.run_in_executor(None, main.pdf_cache.put_file, etag, output_path)
+            return await loop.run_in_executor(None, read_file, path)
+        try:
+            return await loop.run_in_executor(None, read_file, output_path)
+        finally:
+            await loop.run_in_executor(None, discard, output_path)
+
+    async def _optimize(self, path, preset):
+        """Ghostscript pass over a finished PDF; failures keep the original"""
+        candidate = pdf_optimize.optimized_path(path)
+        process = await asyncio.create_subprocess_exec(
+            *pdf_optimize.command(preset, path, candidate),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True
+        )
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), COMPILE_TIMEOUT)
+        except asyncio.TimeoutError:
+            sandbox.kill_group(process.pid)
+            await process.wait()
+            stderr = b"timed out"
+        loop = asyncio.get_running_loop()
+        if process.returncode != 0:
+            logger.error(f"Ghostscript failed with code {process.returncode}: {stderr.decode(errors='replace')[:200]}")
+            await loop.run_in_executor(None, discard, candidate)
+            return
+        main.record_optimization(preset, await loop.run_in_executor(None, pdf_optimize.adopt, path, candidate))
+
+    async def _compile_latex(self, latex_content, output_path, engine):
+        """The async twin of main.generate_pdf. Returns True on success.
+
+        Raises sandbox.LimitExceeded when the compile timed out or broke one
+        of its resource limits.
+        """
+        loop = asyncio.get_running_loop()
+        outcome = 'failure'
+        workspace = None
+        COMPILES_IN_FLIGHT.inc()
+        try:
+            format_args, env = [], None
+            preamble_format = resume_format_for(latex_content, engine)
+            body = preamble_format.split(latex_content) if preamble_format else None
+            # ensure() may build the format on first use, which takes seconds
+            if body is not None and await loop.run_in_executor(None, preamble_format.ensure):
+                format_args, env = preamble_format.compile_args()
+            else:
+                body = latex_content
+
+            workspace = main.workspace_pool.acquire()
+            tex_path = os.path.join(workspace, 'resume.tex')
+            await loop.run_in_executor(None, write_file, tex_path, body)
+
+            cmd = engine.command(tex_path, workspace, format_args)
+            with stage(engine.name):
+                process = await asyncio.create_subprocess_exec(
+                    *sandbox.command(cmd), cwd=workspace, env=env,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    start_new_session=True
+                )
+                try:
+                    stdout, stderr = await asyncio.wait_for(process.communicate(), COMPILE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    sandbox.kill_group(process.pid)
+                    await process.wait()
+                    raise sandbox.LimitExceeded(sandbox.TIMEOUT, f"killed after {COMPILE_TIMEOUT}s")
+                # asyncio has reaped the compile by now, so its pid may have been
+                # reused and the group is not killed; any children it left
+                # inherited its limits
+                reason = sandbox.violation(process.returncode, stderr.decode(errors='replace'))
+                if reason:
+                    raise sandbox.LimitExceeded(reason, f"exit code {process.returncode}")
+
+            if DEBUG_ARTIFACTS:
+                await loop.run_in_executor(None, write_file, os.path.join(workspace, 'debug.tex'), latex_content)
+                await loop.run_in_executor(None, write_file, os.path.join(workspace, 'compile.log'),
+                                           f"STDOUT:\n{stdout.decode(errors='replace')}\n\n"
+                                           f"STDERR:\n{stderr.decode(errors='replace')}")
+
+            if process.returncode != 0:
+                log_path = os.path.join(workspace, 'resume.log')
+                summary = "no LaTeX log written"
+                if os.path.exists(log_path):
+                    log_bytes = await loop.run_in_executor(None, read_file, log_path)
+                    summary = summarize_latex_errors(log_bytes.decode('utf-8', errors='replace'))
+                logger.error(f"{engine.name} failed with code {process.returncode}: {summary}")
+                if DEBUG_ARTIFACTS:
+                    await loop.run_in_executor(None, main.keep_debug_artifacts, workspace)
+                return False
+
+            pdf_path = os.path.join(workspace, 'resume.pdf')
+            size = os.path.getsize(pdf_path) if os.path.exists(pdf_path) else 0
+            if size < 100:
+                logger.error("PDF file not generated or too small (likely invalid)")
+                return False
+            PDF_SIZE_BYTES.observe(size)
+            await loop.run_in_executor(None, main.shutil.move, pdf_path, output_path)
+            logger.info(f"PDF generated successfully: {output_path}")
+            outcome = 'success'
+            return True
+        except sandbox.LimitExceeded as e:
+            logger.error(f"LaTeX compilation stopped ({e.reason}, {e.detail})")
+            outcome = e.reason
+            raise
+        except Exception as e:
+            logger.error(f"Error in async compile: {str(e)}")
+            logger.error(traceback.format_exc())
+            return False
+        finally:
+            COMPILES_IN_FLIGHT.dec()
+            COMPILES.inc(outcome=outcome)
+            if workspace:
+                await loop.run_in_executor(None, main.workspace_pool.release, workspace)
+
+
+def resume_format_for(latex_content, engine):
+    if not (USE_LATEX_FORMAT and engine.supports_formats):
+        return None
+    return main.resume_templates.format_for(latex_content)
+
+
+compiler = AsyncCompiler(MAX_CONCURRENT_COMPILES, ASYNC_MAX_PENDING)
+
+
+def json_error(body, status, headers=None):
+    return web.json_response(body, status=status, headers=headers)
+
+
+async def generate_resume(request):
+    """POST /generate-pdf, served without holding a thread per request"""
+    try:
+        response_mode = request.query.get('response', 'pdf')
+        if response_mode not in main.RESPONSE_MODES:
+            return json_error({"error": f"Unknown response mode: {response_mode}",
+                               "modes": list(main.RESPONSE_MODES)}, 400)
+        if request.content_type != 'application/json':
+            return json_error({"error": "Request must be JSON"}, 400)
+        try:
+            validate_request_size(request.content_length)
+            with stage('json_parse'):
+                data = await request.json()
+        except ValueError:
+            return json_error({"error": "Request body is not valid JSON"}, 400)
+        document = main.prepare_document(data, request.query.get('template'), request.query.get('engine'),
+                                         request.query.get('optimize'), request.query.get('fit'))
+
+        etag = main.pdf_etag(document)
+        if response_mode == 'pdf' and client_has(request, etag):
+            return web.Response(status=304, headers={'ETag': f'W/"{etag}"'})
+
+        loop = asyncio.get_running_loop()
+        compiled = await loop.run_in_executor(None, main.lookup_cached_pdf, etag)
+        if compiled:
+            pdf_content = compiled.content or await loop.run_in_executor(None, read_file, compiled.path)
+        else:
+            if compiler.busy() and not compiler.running(etag):
+                return json_error({"error": "Server busy, please retry shortly", "retry_after": 5}, 503,
+                                  {'Retry-After': '5'})
+            if document.fit_key:
+                compiling = compiler.fitted_pdf_bytes(document, etag)
+            else:
+                compiling = compiler.pdf_bytes(document, etag)
+            try:
+                pdf_content = await asyncio.wait_for(compiling, PDF_JOB_WAIT_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.error(f"Async PDF compile still running after {PDF_JOB_WAIT_TIMEOUT}s")
+                return json_error({"error": "PDF generation timed out"}, 504)
+            except sandbox.LimitExceeded as e:
+                return json_error(e.to_dict(), e.status, {'Retry-After': '5'} if e.status == 503 else None)
+            if not pdf_content:
+                logger.error("PDF generation failed")
+                return json_error({"error": "PDF generation failed"}, 500)
+
+        if response_mode != 'pdf':
+            digest = await loop.run_in_executor(None, main.publish_pdf, pdf_content)
+            url = main.published_url(digest, f"{request.scheme}://{request.host}")
+            if response_mode == 'redirect':
+                return web.Response(status=303, headers={'Location': url})
+            return web.json_response({"url": url, "sha256": digest, "retention_seconds": main.PDF_LINK_MAX_AGE},
+                                     status=201, headers={'Location': url})
+
+        return web.Response(body=pdf_content, content_type='application/pdf', headers={
+            'ETag': f'W/"{etag}"',
+            'Content-Disposition': f'attachment; filename="{main.pdf_download_name()}"',
+        })
+    except web.HTTPException:
+        raise
+    except ValidationError as e:
+        logger.warning(f"Rejected resume payload ({e.reason}): {str(e)}")
+        REJECTED.inc(reason=e.reason)
+        return json_error(e.to_dict(), e.status)
+    except Exception as e:
+        logger.error(f"Error in async generate_resume: {str(e)}")
+        logger.error(traceback.format_exc())
+        return json_error({"error": "Internal server error", "details": str(e)}, 500)
+
+
+async def published_pdf(request):
+    """GET /pdf/<digest>: immutable download of a published PDF"""
+    digest = request.match_info['digest']
+    loop = asyncio.get_running_loop()
+    path = None
+    if main.PUBLISHED_DIGEST.fullmatch(digest):
+        path = await loop.run_in_executor(None, main.published_pdfs.get_path, digest)
+    if not path:
+        return json_error({"error": "Unknown or expired PDF"}, 404, {'Cache-Control': 'no-store'})
+    headers = {'ETag': f'"{digest}"', 'Cache-Control': main.IMMUTABLE_CACHE_CONTROL}
+    if client_has(request, digest):
+        return web.Response(status=304, headers=headers)
+    return web.Response(body=await loop.run_in_executor(None, read_file, path), content_type='application/pdf', headers={
+        **headers,
+        'Content-Disposition': f'attachment; filename="{main.pdf_download_name()}"',
+    })
+
+
+def client_has(request, etag):
+    """True if the request's If-None-Match covers etag (weak comparison)"""
+    return parse_etags(request.headers.get('If-None-Match')).contains_weak(etag)
+
+
+async def liveness_check(request):
+    return web.json_response({"status": "alive"})
+
+
+async def readiness_check(request):
+    ready = main.warmup.ready() and main.canary.healthy() and os.access(main.TEMP_PDF_DIR, os.W_OK)
+    return web.json_response({
+        "status": "ready" if ready else "not ready",
+        "warmup": main.warmup.state(),
+        "canary": main.canary.state(),
+        "pending_compiles": compiler.pending(),
+    }, status=200 if ready else 503)
+
+
+async def metrics(request):
+    return web.Response(text=REGISTRY.render(), headers={'Content-Type': METRICS_CONTENT_TYPE})
+
+
+@web.middleware
+async def count_request(request, handler):
+    endpoint = request.match_info.route.name or 'unknown'
+    trace_id = tracing.trace_id_from(request.headers)
+    with tracing.trace(trace_id), tracing.span(endpoint, method=request.method):
+        response = await handler(request)
+    HTTP_REQUESTS.inc(endpoint=endpoint, status=response.status)
+    response.headers[tracing.TRACE_HEADER] = trace_id
+    return response
+
+
+def create_app():
+    app = web.Application(middlewares=[count_request], client_max_size=DEFAULT_LIMITS.max_request_bytes)
+    app.router.add_post('/generate-pdf', generate_resume, name='generate_resume')
+    app.router.add_get('/pdf/{digest}', published_pdf, name='published_pdf')
+    app.router.add_get('/health/live', liveness_check, name='liveness_check')
+    app.router.add_get('/health/ready', readiness_check, name='readiness_check')
+    app.router.add_get('/metrics', metrics, name='metrics')
+    return app
+
+
+if __name__ == "__main__":
+    port = int(os.environ.get("PORT", 8080))
+    logger.info(f"Starting Rizzume async API on port {port} ({MAX_CONCURRENT_COMPILES} compile slots)")
+    web.run_app(create_app(), host="0.0.0.0", port=port, print=None)
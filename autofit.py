@@ -0,0 +1,124 @@
+import re
+import zlib
+import threading
+from collections import OrderedDict
+
+OFF = 'off'
+ONE_PAGE = 'one-page'
+MODES = (OFF, ONE_PAGE)
+
+# Compactness levels, loosest first. Each is LaTeX placed right after
+# \begin{document}, so the preamble (and its dumped format) is untouched.
+# \linespread applies to every later size switch, including the \small the
+# templates set bullets in; \enlargethispage only stretches page 1, which is
+# the only page a fitted resume has. Levels use \renewcommand, never \let or
+# \def, so fitted documents still pass validation.lint_latex.
+LEVELS = [
+    '',
+    r'\linespread{0.97}\selectfont\setlist{itemsep=0pt, topsep=2pt}',
+    r'\linespread{0.94}\selectfont\setlist{itemsep=0pt, topsep=1pt, parsep=0pt}'
+    r'\enlargethispage{\baselineskip}',
+    r'\linespread{0.91}\selectfont\setlist{itemsep=0pt, topsep=0pt, parsep=0pt}'
+    r'\titlespacing*{\section}{0pt}{6pt}{3pt}\enlargethispage{2\baselineskip}',
+    r'\linespread{0.88}\selectfont\setlist{itemsep=0pt, topsep=0pt, parsep=0pt}'
+    r'\titlespacing*{\section}{0pt}{4pt}{2pt}\enlargethispage{3\baselineskip}',
+    r'\linespread{0.86}\selectfont\setlist{itemsep=0pt, topsep=0pt, parsep=0pt}'
+    r'\titlespacing*{\section}{0pt}{4pt}{2pt}\enlargethispage{3\baselineskip}'
+    r'\renewcommand\small{\footnotesize}',
+]
+TIGHTEST = len(LEVELS) - 1
+
+BEGIN_DOCUMENT = r'\begin{document}'
+
+_PAGE_TREE_COUNT = re.compile(rb'/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b')
+_OBJECT_STREAM = re.compile(rb'/Type\s*/ObjStm\b[^>]*>>\s*stream\r?\n')
+
+
+def apply(latex_content, level):
+    """latex_content with the settings of a compactness level switched on"""
+    if not LEVELS[level]:
+        return latex_content
+    head, begin, rest = latex_content.partition(BEGIN_DOCUMENT)
+    return f"{head}{begin}\n% rizzume auto-fit level {level}\n{LEVELS[level]}{rest}"
+
+
+def search(start=0):
+    """Pick the loosest level that fits on one page in as few compiles as possible.
+
+    A generator: it yields the level to compile next and is sent the page
+    count that compile produced; its return value is the level to use. It
+    bisects the whole range of levels, taking `start`, normally the level
+    this resume was last fitted at, as the first guess. If that still fits,
+    the next looser level is tried, so a resume that has since been shortened
+    is loosened again; usually it overflows and the guess stands after two
+    compiles. When the guess overflows, tighter levels are bisected, probing
+    the lower third first since most overflows are slight, and a compile that
+    ran to 3+ pages jumps straight to the tightest level. If even that
+    overflows, the tightest level is returned anyway.
+    """
+    start = min(max(start, 0), TIGHTEST)
+    overflows = -1          # highest level known to overflow
+    fits = None             # lowest level known to fit
+    level = start
+    while True:
+        pages = yield level
+        if pages <= 1:
+            fits = level
+        else:
+            overflows = level
+        if fits is not None and fits - overflows <= 1:
+            return fits
+        if overflows >= TIGHTEST:
+            return TIGHTEST
+        if fits is None:
+            level = TIGHTEST if pages > 2 else overflows + 1 + (TIGHTEST - overflows - 1) // 3
+        elif level == start and fits == start:
+            level = start - 1
+        else:
+            level = (overflows + fits) // 2
+
+
+def pdf_pages(pdf_content):
+    """Page count of a PDF from its page tree root, or None if it can't be found.
+
+    pdfTeX and Ghostscript may pack the root into a compressed object stream,
+    so those are inflated when the count isn't in the plain bytes.
+    """
+    counts = [int(a or b) for a, b in _PAGE_TREE_COUNT.findall(pdf_content)]
+    if not counts:
+        for match in _OBJECT_STREAM.finditer(pdf_content):
+            try:
+                objects = zlib.decompressobj().decompress(pdf_content[match.end():])
+            except zlib.error:
+                continue
+            counts.extend(int(a or b) for a, b in _PAGE_TREE_COUNT.findall(objects))
+    # The root holds every page; intermediate tree nodes hold fewer
+    return max(counts) if counts else None
+
+
+class FittedLevels:
+    """LRU of the level each resume was last fitted at, so an edited resume
+    starts its search there instead of from scratch"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._levels = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            level = self._levels.get(key)
+            if level is not None:
+                self._levels.move_to_end(key)
+            return level
+
+    def put(self, key, level):
+        with self._lock:
+            self._levels[key] = level
+            self._levels.move_to_end(key)
+            while len(self._levels) > self.max_entries:
+                self._levels.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._levels)
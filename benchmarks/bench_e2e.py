@@ -0,0 +1,96 @@
+"""Time a resume end to end: payload to LaTeX, then LaTeX to PDF, per payload profile.
+
+Usage: python benchmarks/bench_e2e.py [--runs N] [--profiles a,b] [--fake-tex] [--no-pool]
+
+Runs in-process against render_document, i.e. the same generate_pdf path the
+job queue uses, with the PDF cache off so every run compiles. --fake-tex puts
+benchmarks/fakebin first on PATH, which measures the pipeline around TeX
+rather than TeX itself. --no-pool compiles without the warm pdflatex pool.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payloads import PROFILES, profile  # noqa: E402
+
+FAKEBIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fakebin')
+
+
+def configure(fake_tex=False, pool=True):
+    """Environment for an in-process run; must happen before main is imported"""
+    if fake_tex:
+        os.environ['PATH'] = FAKEBIN + os.pathsep + os.environ.get('PATH', '')
+    os.environ['PDF_CACHE_ENABLED'] = '0'
+    os.environ.setdefault('HEALTH_CANARY_INTERVAL', '3600')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    if not pool:
+        os.environ['PDFLATEX_POOL_SIZE'] = '0'
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[int(fraction * (len(sorted_values) - 1))]
+
+
+def measure(runs, profiles=tuple(PROFILES)):
+    import main
+
+    main.warmup.wait()
+    rows = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for name in profiles:
+            build, render = [], []
+            source_bytes = pdf_bytes = None
+            for i in range(runs):
+                data = profile(name, unique=i)
+                start = time.perf_counter()
+                document = main.build_resume_document(data)
+                build.append((time.perf_counter() - start) * 1000)
+                output_path = os.path.join(out_dir, f"{name}-{i}.pdf")
+                start = time.perf_counter()
+                if not main.render_document(document, output_path):
+                    rows.append({"profile": name, "error": "render failed, see rizzume.log"})
+                    break
+                render.append((time.perf_counter() - start) * 1000)
+                source_bytes = len(document.source.encode('utf-8'))
+                pdf_bytes = os.path.getsize(output_path)
+                os.remove(output_path)
+            else:
+                render.sort()
+                rows.append({
+                    "profile": name,
+                    "runs": runs,
+                    "source_bytes": source_bytes,
+                    "pdf_bytes": pdf_bytes,
+                    "build_ms": statistics.median(build),
+                    "render_p50_ms": statistics.median(render),
+                    "render_p95_ms": percentile(render, 0.95),
+                    "render_min_ms": render[0],
+                })
+    return rows
+
+
+def run(runs, profiles):
+    print(f"{'profile':<14} {'source KB':>10} {'build ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'min ms':>8} {'PDF KB':>7}")
+    for row in measure(runs, profiles):
+        if "error" in row:
+            print(f"{row['profile']:<14} error: {row['error']}")
+            continue
+        print(f"{row['profile']:<14} {row['source_bytes'] / 1024:>10.1f} {row['build_ms']:>9.3f} "
+              f"{row['render_p50_ms']:>8.1f} {row['render_p95_ms']:>8.1f} {row['render_min_ms']:>8.1f} "
+              f"{row['pdf_bytes'] / 1024:>7.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    parser.add_argument('--fake-tex', action='store_true', help='compile with benchmarks/fakebin/pdflatex')
+    parser.add_argument('--no-pool', action='store_true', help='disable the warm pdflatex pool')
+    args = parser.parse_args()
+    configure(args.fake_tex, pool=not args.no_pool)
+    run(args.runs, args.profiles.split(','))
@@ -0,0 +1,106 @@
+"""Compare render engines on the same resume: latency, peak memory and PDF size.
+
+Usage: python benchmarks/bench_engines.py [--runs N] [--json]
+
+Each engine is measured in a fresh interpreter so peak RSS (ru_maxrss) is
+attributable to it: the TeX process for LaTeX engines, the Python process
+itself for the in-process HTML engine. For LaTeX engines the peak also covers
+the startup format build and canary compile, which use pdflatex. Caching and
+the warm pool are bypassed; every run renders from scratch.
+Unix only (uses the resource module).
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payloads import SAMPLE_RESUME  # noqa: E402
+
+# Template each engine renders; LaTeX engines share one so output is comparable
+ENGINE_TEMPLATES = {'pdflatex': 'classic', 'xelatex': 'classic', 'html': 'web'}
+
+
+def measure(engine_name, runs):
+    """Runs in the child interpreter: render `runs` times and report as JSON"""
+    import main
+
+    main.warmup.wait()
+    engine = main.ENGINES[engine_name]
+    if not engine.available():
+        return {"engine": engine_name, "available": False}
+    document = main.build_resume_document(SAMPLE_RESUME, ENGINE_TEMPLATES[engine_name], engine_name)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    size = None
+    with tempfile.TemporaryDirectory() as out_dir:
+        for i in range(runs):
+            output_path = os.path.join(out_dir, f"{i}.pdf")
+            start = time.perf_counter()
+            if not main.render_document(document, output_path):
+                return {"engine": engine_name, "available": True, "error": "render failed, see rizzume.log"}
+            timings.append(time.perf_counter() - start)
+            size = os.path.getsize(output_path)
+    if engine.source_type == main.HTML:
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss
+    else:
+        peak_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    timings.sort()
+    return {
+        "engine": engine_name,
+        "available": True,
+        "version": engine.version(),
+        "runs": runs,
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "p95_ms": round(timings[int(0.95 * (len(timings) - 1))] * 1000, 1),
+        "min_ms": round(timings[0] * 1000, 1),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "pdf_bytes": size,
+    }
+
+
+def run(runs, as_json):
+    results = []
+    for engine_name in ENGINE_TEMPLATES:
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--measure', engine_name, '--runs', str(runs)],
+            capture_output=True, text=True,
+            # Keep the engine's own timings free of warm pools and canaries
+            env={**os.environ, 'PDF_CACHE_ENABLED': '0', 'PDFLATEX_POOL_SIZE': '0',
+                 'HEALTH_CANARY_INTERVAL': '3600', 'LOG_LEVEL': 'WARNING'}
+        )
+        if child.returncode != 0:
+            results.append({"engine": engine_name, "error": child.stderr.strip().splitlines()[-1:]})
+            continue
+        results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    if as_json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'engine':<10} {'median ms':>10} {'p95 ms':>8} {'min ms':>8} {'peak MB':>8} {'PDF bytes':>10}")
+    for result in results:
+        if not result.get("available", True):
+            print(f"{result['engine']:<10} not available")
+        elif "error" in result:
+            print(f"{result['engine']:<10} error: {result['error']}")
+        else:
+            print(f"{result['engine']:<10} {result['median_ms']:>10.1f} {result['p95_ms']:>8.1f} "
+                  f"{result['min_ms']:>8.1f} {result['peak_rss_mb']:>8.1f} {result['pdf_bytes']:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.runs)))
+    else:
+        run(args.runs, args.json)
@@ -0,0 +1,95 @@
+"""Compare LaTeX escaping throughput: legacy replace chain vs one-pass translate.
+
+Usage: python benchmarks/bench_escape.py [--runs N]
+
+"per-field" escapes every payload string with a separate call, the way the
+resume builder used to; "payload" escapes the whole resume with escape_payload.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from latex_escape import escape_latex, escape_payload  # noqa: E402
+from payloads import SIZES, make_resume  # noqa: E402
+
+LEGACY_REPLACEMENTS = {
+    '\\': r'\\textbackslash{}',
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum{}',
+    '<': r'\textless{}',
+    '>': r'\textgreater{}',
+}
+
+
+def legacy_escape_latex(text):
+    """The previous escaper: one str.replace pass per special character"""
+    if not text:
+        return ""
+    for char, replacement in LEGACY_REPLACEMENTS.items():
+        text = text.replace(char, replacement)
+    return text
+
+
+def payload_strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, child in value.items():
+            yield key
+            yield from payload_strings(child)
+    elif isinstance(value, list):
+        for child in value:
+            yield from payload_strings(child)
+
+
+def time_ms(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def measure(runs, sizes=SIZES):
+    rows = []
+    for label, entries, bullets in sizes:
+        data = make_resume(entries, bullets)
+        strings = list(payload_strings(data))
+        size = sum(len(s.encode('utf-8')) for s in strings)
+        payload_ms = time_ms(lambda: escape_payload(data), runs)
+        rows.append({
+            "size": label,
+            "strings": len(strings),
+            "bytes": size,
+            "legacy_ms": time_ms(lambda: [legacy_escape_latex(s) for s in strings], runs),
+            "per_field_ms": time_ms(lambda: [escape_latex(s) for s in strings], runs),
+            "payload_ms": payload_ms,
+            "mb_per_s": size / 1e6 / (payload_ms / 1000),
+        })
+    return rows
+
+
+def run(runs):
+    print(f"{'size':<6} {'strings':>7} {'KB':>6} {'legacy ms':>10} {'per-field ms':>13} {'payload ms':>11} {'MB/s':>7}")
+    for row in measure(runs):
+        print(f"{row['size']:<6} {row['strings']:>7} {row['bytes'] / 1024:>6.1f} {row['legacy_ms']:>10.3f} "
+              f"{row['per_field_ms']:>13.3f} {row['payload_ms']:>11.3f} {row['mb_per_s']:>7.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+    run(args.runs)
@@ -0,0 +1,60 @@
+"""Compare cold pdflatex compile time with and without the preamble format.
+
+Usage: python benchmarks/bench_latex_format.py [--runs N]
+
+Every run spawns a fresh pdflatex process, exactly like a request does.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Cold compiles only: no parked warm workers serving the format runs, no cache hits
+os.environ['PDFLATEX_POOL_SIZE'] = '0'
+os.environ['PDF_CACHE_ENABLED'] = '0'
+
+import main  # noqa: E402
+from payloads import SAMPLE_RESUME  # noqa: E402
+
+def time_compiles(latex_content, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pdf = main.generate_pdf(latex_content)
+        timings.append(time.perf_counter() - start)
+        if not pdf:
+            raise SystemExit("Compile failed, see rizzume.log")
+    return timings
+
+
+def report(label, timings):
+    print(f"{label:<16} mean {statistics.mean(timings) * 1000:8.1f} ms   "
+          f"median {statistics.median(timings) * 1000:8.1f} ms   "
+          f"min {min(timings) * 1000:8.1f} ms")
+
+
+def run(runs):
+    # Timings start once startup warm-up (format build, warm compiles) is done
+    main.warmup.wait()
+    latex_content = main.build_resume_latex(SAMPLE_RESUME)
+
+    main.USE_LATEX_FORMAT = False
+    without_format = time_compiles(latex_content, runs)
+
+    main.USE_LATEX_FORMAT = True
+    if not main.resume_format.ensure():
+        raise SystemExit("Could not build the preamble format")
+    with_format = time_compiles(latex_content, runs)
+
+    report("without format", without_format)
+    report("with format", with_format)
+    print(f"speedup          {statistics.median(without_format) / statistics.median(with_format):.2f}x (median)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+    run(args.runs)
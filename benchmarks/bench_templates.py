@@ -0,0 +1,62 @@
+"""Measure resume rendering time per template for small and very large resumes.
+
+Usage: python benchmarks/bench_templates.py [--runs N]
+
+Escaping the payload (context) and rendering the compiled template are timed
+separately; no pdflatex is involved.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from payloads import SIZES, make_resume  # noqa: E402
+
+
+def time_ms(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def measure(runs, sizes=SIZES):
+    rows = []
+    for label, entries, bullets in sizes:
+        data = make_resume(entries, bullets)
+        bullet_count = sum(len(e["bullets"]) for e in data["experience"] + data["projects"])
+        context = main.resume_context(data)
+        context_ms = time_ms(lambda: main.resume_context(data), runs)
+        for template in main.resume_templates:
+            if template.source_type != main.LATEX:
+                continue
+            rows.append({
+                "template": template.name,
+                "size": label,
+                "bullets": bullet_count,
+                "context_ms": context_ms,
+                "render_ms": time_ms(lambda: template.render(context), runs),
+                "total_ms": time_ms(lambda: main.build_resume_latex(data, template.name), runs),
+                "bytes": len(template.render(context).encode('utf-8')),
+            })
+    return rows
+
+
+def run(runs):
+    print(f"{'template':<10} {'size':<6} {'bullets':>7} {'context ms':>11} {'render ms':>10} {'total ms':>9} {'KB':>7}")
+    for row in measure(runs):
+        print(f"{row['template']:<10} {row['size']:<6} {row['bullets']:>7} {row['context_ms']:>11.3f} "
+              f"{row['render_ms']:>10.3f} {row['total_ms']:>9.3f} {row['bytes'] / 1024:>7.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+    run(args.runs)
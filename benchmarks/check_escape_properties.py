@@ -0,0 +1,103 @@
+"""Randomized property checks for latex_escape.
+
+Usage: python benchmarks/check_escape_properties.py [--cases N] [--seed S]
+
+Generates random strings biased towards LaTeX specials and checks that:
+  - unescaping the output gives back the input (nothing lost or doubled)
+  - no special character survives outside an escape sequence
+  - braces in the output are balanced once escaped braces are ignored
+  - escape_payload agrees with escape_latex on every string
+Exits non-zero with the first counterexample found.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from latex_escape import LATEX_SPECIALS, escape_latex, escape_payload  # noqa: E402
+
+ALPHABET = list(LATEX_SPECIALS) + list("aZ09 -.,:;'\"!?/|*@\t\n") + ['é', '—', '“', '中', '😀']
+REVERSE = {replacement: char for char, replacement in LATEX_SPECIALS.items()}
+# Longest first so \textbackslash{} is not read as a shorter sequence
+ESCAPE_SEQUENCE = re.compile('|'.join(re.escape(r) for r in sorted(REVERSE, key=len, reverse=True)))
+
+
+def random_text(rng):
+    length = rng.choice([0, 1, 2, 5, 20, 80, 300])
+    return ''.join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def unescape(escaped):
+    return ESCAPE_SEQUENCE.sub(lambda m: REVERSE[m.group(0)], escaped)
+
+
+def check_text(text):
+    escaped = escape_latex(text)
+    if unescape(escaped) != text:
+        return f"round trip failed: {text!r} -> {escaped!r}"
+    bare = ESCAPE_SEQUENCE.sub('', escaped)
+    leftover = [c for c in bare if c in LATEX_SPECIALS]
+    if leftover:
+        return f"unescaped {leftover[0]!r} in {escaped!r} (from {text!r})"
+    depth = 0
+    for char in re.sub(r'\\[{}]', '', escaped):
+        depth += {'{': 1, '}': -1}.get(char, 0)
+        if depth < 0:
+            break
+    if depth != 0:
+        return f"unbalanced braces in {escaped!r} (from {text!r})"
+    return None
+
+
+def random_payload(rng):
+    return {
+        "name": random_text(rng),
+        "phone": rng.choice([random_text(rng), None, 5551234]),
+        "experience": [
+            {"position": random_text(rng), "bullets": [random_text(rng) for _ in range(rng.randint(0, 4))]}
+            for _ in range(rng.randint(0, 3))
+        ],
+        "skills": {random_text(rng): [random_text(rng) for _ in range(rng.randint(0, 4))]},
+    }
+
+
+def check_payload(payload):
+    escaped = escape_payload(payload)
+
+    def compare(original, result):
+        if isinstance(original, dict):
+            if list(original) != list(result):
+                return f"payload keys changed: {list(original)!r} -> {list(result)!r}"
+            return next(filter(None, (compare(original[k], result[k]) for k in original)), None)
+        if isinstance(original, list):
+            return next(filter(None, (compare(o, r) for o, r in zip(original, result))), None)
+        if result != escape_latex(original):
+            return f"escape_payload disagrees on {original!r}: {result!r}"
+        return None
+
+    return compare(payload, escaped)
+
+
+def run(cases, seed):
+    rng = random.Random(seed)
+    fixed = ['', '\\', '{}', '\\{}', '}{', '\\textbackslash{}', '100% & $5 #1 a_b ~^ <x>']
+    for text in fixed + [random_text(rng) for _ in range(cases)]:
+        failure = check_text(text)
+        if failure:
+            raise SystemExit(f"FAIL {failure}")
+    for _ in range(cases // 10):
+        failure = check_payload(random_payload(rng))
+        if failure:
+            raise SystemExit(f"FAIL {failure}")
+    print(f"OK {len(fixed) + cases} strings and {cases // 10} payloads (seed {seed})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cases', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=random.randrange(1 << 30))
+    args = parser.parse_args()
+    run(args.cases, args.seed)
@@ -0,0 +1,76 @@
+"""Compare two run_suite.py result files and flag regressions.
+
+Usage: python benchmarks/compare_results.py BASELINE.json CANDIDATE.json [--threshold 10]
+
+Rows are matched on their identifying fields (size, template, profile,
+concurrency). Timings ("*_ms") that grew, and throughputs ("rps", "mb_per_s")
+that shrank, by more than --threshold percent are marked REGRESSION. Exits
+with status 1 if any are, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+KEY_FIELDS = ('template', 'size', 'profile', 'concurrency')
+HIGHER_IS_BETTER = ('rps', 'mb_per_s')
+
+
+def flatten(results):
+    """{(section, row key): row} for every result row"""
+    rows = {}
+    for section, value in results.items():
+        if section == "meta":
+            continue
+        groups = value.items() if isinstance(value, dict) else [(None, value)]
+        for group, group_rows in groups:
+            name = f"{section}.{group}" if group else section
+            for row in group_rows:
+                key = tuple(f"{field}={row[field]}" for field in KEY_FIELDS if field in row)
+                rows[(name, key)] = row
+    return rows
+
+
+def compare(baseline, candidate, threshold):
+    old_rows, new_rows = flatten(baseline), flatten(candidate)
+    lines, regressions = [], 0
+    for (section, key), new in new_rows.items():
+        old = old_rows.get((section, key))
+        if old is None:
+            continue
+        for metric, new_value in new.items():
+            if not (metric.endswith('_ms') or metric in HIGHER_IS_BETTER):
+                continue
+            old_value = old.get(metric)
+            if not old_value or not isinstance(new_value, (int, float)):
+                continue
+            change = (new_value - old_value) / old_value * 100
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = "REGRESSION" if worse > threshold else ("improved" if worse < -threshold else "")
+            regressions += flag == "REGRESSION"
+            lines.append(f"{section:<14} {' '.join(key):<32} {metric:<16} {old_value:>10.3f} "
+                         f"{new_value:>10.3f} {change:>+7.1f}%  {flag}")
+    return lines, regressions
+
+
+def main(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    for field in ("commit", "cpus", "python", "tex", "fake_tex", "quick"):
+        old, new = baseline["meta"].get(field), candidate["meta"].get(field)
+        if old != new:
+            print(f"note: {field} differs ({old} vs {new})")
+    lines, regressions = compare(baseline, candidate, args.threshold)
+    print(f"{'section':<14} {'row':<32} {'metric':<16} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    print('\n'.join(lines))
+    print(f"{regressions} regression(s) over {args.threshold}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10, help='percent change that counts')
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,177 @@
+"""Closed-loop HTTP load generator for /generate-pdf: latency percentiles and throughput.
+
+Usage: python benchmarks/loadgen.py [--concurrency 1,4,16] [--requests N] [--profile NAME]
+                                    [--unique] [--fake-tex] [--async] [--url http://host:port]
+
+Without --url it starts `python main.py` (or async_server.py with --async) on
+a free port with its own temp directories and stops it afterwards. --fake-tex gives that server
+benchmarks/fakebin on PATH (compile time set by FAKE_TEX_SECONDS), so the web
+tier, queue and cache can be scaled without TeX installed. Each concurrency
+level sends --requests requests from that many client threads, each starting
+the next request as soon as the previous one returns. --unique makes every
+request a distinct document, so it measures compiles instead of cache hits.
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from payloads import PROFILES, profile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKEBIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fakebin')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class LocalServer:
+    """main.py in a child process, isolated in a temp directory"""
+
+    def __init__(self, fake_tex=False, env=None, script='main.py'):
+        self.fake_tex = fake_tex
+        self.script = script
+        self.env = env or {}
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.process = None
+        self.tmp = None
+
+    def __enter__(self):
+        self.tmp = tempfile.mkdtemp(prefix='rizzume-load-')
+        env = {
+            **os.environ,
+            'PORT': str(self.port),
+            'TEMP_PDF_DIR': self.tmp,
+            'SCRATCH_DIR': os.path.join(self.tmp, 'scratch'),
+            'LOG_FILE': os.path.join(self.tmp, 'rizzume.log'),
+            'LOG_LEVEL': 'WARNING',
+            # Served as in production, whatever the calling benchmark set for itself
+            'PDF_CACHE_ENABLED': '1',
+            **self.env,
+        }
+        if self.fake_tex:
+            env['PATH'] = FAKEBIN + os.pathsep + env.get('PATH', '')
+        self.process = subprocess.Popen([sys.executable, self.script], cwd=ROOT, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 120
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"server exited with {self.process.returncode}, see {env['LOG_FILE']}")
+            try:
+                urllib.request.urlopen(f"{self.url}/health/live", timeout=1).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError("server did not come up within 120s")
+
+    def __exit__(self, *exc):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def post_pdf(url, body, timeout):
+    """One request; returns (status, seconds, response bytes)"""
+    request = urllib.request.Request(f"{url}/generate-pdf", data=body, method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            size = len(response.read())
+            return response.status, time.perf_counter() - start, size
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code, time.perf_counter() - start, 0
+    except OSError:
+        return 'error', time.perf_counter() - start, 0
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[int(fraction * (len(sorted_values) - 1))]
+
+
+def run_level(url, concurrency, requests, profile_name, unique, timeout, offset=0):
+    # Bodies are encoded up front so clients only time the request itself
+    bodies = [json.dumps(profile(profile_name, unique=offset + i if unique else None)).encode()
+              for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda body: post_pdf(url, body, timeout), bodies))
+    elapsed = time.perf_counter() - start
+
+    statuses = {}
+    for status, _, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ok = sorted(seconds * 1000 for status, seconds, _ in results if status == 200)
+    row = {
+        "concurrency": concurrency,
+        "requests": requests,
+        "seconds": elapsed,
+        "rps": len(ok) / elapsed,
+        "statuses": statuses,
+    }
+    if ok:
+        row.update({
+            "p50_ms": percentile(ok, 0.50),
+            "p95_ms": percentile(ok, 0.95),
+            "p99_ms": percentile(ok, 0.99),
+            "max_ms": ok[-1],
+            "mean_ms": statistics.mean(ok),
+        })
+    return row
+
+
+def measure(levels, requests, profile_name='typical', unique=True, fake_tex=False, url=None,
+            timeout=120, server_env=None, script='main.py'):
+    if url:
+        return [run_level(url, c, requests, profile_name, unique, timeout, offset=n * requests)
+                for n, c in enumerate(levels)]
+    with LocalServer(fake_tex, server_env, script) as server:
+        # One untimed request so format loading and worker startup aren't in level one
+        post_pdf(server.url, json.dumps(profile(profile_name, unique='warmup')).encode(), timeout)
+        return [run_level(server.url, c, requests, profile_name, unique, timeout, offset=n * requests)
+                for n, c in enumerate(levels)]
+
+
+def run(args):
+    rows = measure([int(c) for c in args.concurrency.split(',')], args.requests, args.profile,
+                   args.unique, args.fake_tex, args.url, args.timeout,
+                   script='async_server.py' if args.use_async else 'main.py')
+    print(f"{'clients':>7} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  statuses")
+    for row in rows:
+        if "p50_ms" not in row:
+            print(f"{row['concurrency']:>7} {row['rps']:>7.1f} {'-':>8} {'-':>8} {'-':>8} {'-':>8}  {row['statuses']}")
+            continue
+        print(f"{row['concurrency']:>7} {row['rps']:>7.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}  {row['statuses']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--concurrency', default='1,4,16', help='comma separated client counts')
+    parser.add_argument('--requests', type=int, default=100, help='requests per concurrency level')
+    parser.add_argument('--profile', default='typical', choices=list(PROFILES))
+    parser.add_argument('--unique', action='store_true', help='make every request a cache miss')
+    parser.add_argument('--fake-tex', action='store_true', help='serve with benchmarks/fakebin/pdflatex')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='serve with async_server.py')
+    parser.add_argument('--url', help='load an already running server instead of starting one')
+    parser.add_argument('--timeout', type=float, default=120)
+    run(parser.parse_args())
@@ -0,0 +1,102 @@
+"""Synthetic resume payloads shared by the benchmarks"""
+import copy
+
+SAMPLE_RESUME = {
+    "name": "Jane Doe",
+    "phone": "555-123-4567",
+    "email": "jane@example.com",
+    "linkedin": "janedoe",
+    "github": "janedoe",
+    "education": [
+        {"institution": "State University", "location": "Springfield",
+         "degree": "B.S. Computer Science", "dates": "2016 -- 2020"},
+    ],
+    "experience": [
+        {"position": "Software Engineer", "dates": "2020 -- Present", "company": "Acme & Co",
+         "location": "Remote", "bullets": [f"Shipped feature #{i} with 50% less latency" for i in range(6)]},
+    ],
+    "projects": [
+        {"name": "Rizzume", "technologies": "Python, Flask, LaTeX", "dates": "2024",
+         "bullets": ["Built a resume generator", "Cut compile time with a dumped format"]},
+    ],
+    "skills": {"Languages": ["Python", "C++", "SQL"], "Tools": ["Docker", "Git"]},
+}
+
+
+# (label, experience entries, bullets per entry)
+SIZES = [
+    ("small", 2, 4),
+    ("large", 20, 10),
+    ("huge", 50, 20),
+]
+
+
+def make_resume(entries, bullets):
+    return {
+        "name": "Jane Doe",
+        "phone": "555-123-4567",
+        "email": "jane@example.com",
+        "linkedin": "janedoe",
+        "github": "janedoe",
+        "education": [
+            {"institution": f"University {i}", "location": "Springfield",
+             "degree": "B.S. Computer Science", "dates": "2016 -- 2020"}
+            for i in range(3)
+        ],
+        "experience": [
+            {"position": f"Engineer {i}", "dates": "2020 -- Present", "company": f"Acme & Co #{i}",
+             "location": "Remote",
+             "bullets": [f"Cut p99 latency by {j}% for {i}_service using C++ & SIMD" for j in range(bullets)]}
+            for i in range(entries)
+        ],
+        "projects": [
+            {"name": f"Project {i}", "technologies": "Python, Flask, LaTeX", "dates": "2024",
+             "bullets": [f"Shipped milestone {j} ~ ahead of schedule" for j in range(bullets)]}
+            for i in range(entries // 2 + 1)
+        ],
+        "skills": {f"Category {i}": [f"Skill {j}" for j in range(12)] for i in range(6)},
+    }
+
+
+def long_bullets_resume():
+    """Few entries, each bullet several lines long"""
+    data = make_resume(4, 6)
+    for entry in data["experience"] + data["projects"]:
+        entry["bullets"] = [bullet + ", " + " ".join(f"then scaled it to {k} regions" for k in range(25))
+                            for bullet in entry["bullets"]]
+    return data
+
+
+def special_heavy_resume():
+    """Mostly LaTeX special characters, the worst case for escaping"""
+    data = make_resume(8, 8)
+    specials = r"50% of $5 & #1 {a_b} ~x^2 <c> \path"
+    for entry in data["experience"] + data["projects"]:
+        entry["bullets"] = [f"{specials} {j} {specials}" for j in range(len(entry["bullets"]))]
+    return data
+
+
+def minimal_resume():
+    return {"name": "Jane Doe", "email": "jane@example.com", "education": [], "experience": [],
+            "projects": [], "skills": {}}
+
+
+# Deterministic request bodies from smallest to largest; no randomness so two
+# runs of the suite always send the same bytes
+PROFILES = {
+    "minimal": minimal_resume,
+    "typical": lambda: SAMPLE_RESUME,
+    "large": lambda: make_resume(20, 10),
+    "huge": lambda: make_resume(50, 20),
+    "long_bullets": long_bullets_resume,
+    "special_heavy": special_heavy_resume,
+}
+
+
+def profile(name, unique=None):
+    """A fresh copy of a profile's payload. `unique` makes the document (and so
+    its cache key) distinct, to measure compiles rather than cache hits."""
+    data = copy.deepcopy(PROFILES[name]())
+    if unique is not None:
+        data["name"] = f"{data['name']} {unique}"
+    return data
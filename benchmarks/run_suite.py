@@ -0,0 +1,99 @@
+"""Run the benchmark suite and write the results as JSON for later comparison.
+
+Usage: python benchmarks/run_suite.py [--quick] [--fake-tex] [--skip micro,e2e,load] [--output FILE]
+
+Sections: "micro" (escaping and template rendering), "e2e" (payload to PDF
+per profile, in-process) and "load" (HTTP latency and throughput against a
+local server at several concurrency levels). Results go to
+benchmarks/results/<timestamp>-<commit>.json unless --output is given, with
+enough metadata (commit, Python, CPU count, TeX version, settings) to tell
+whether two files are comparable. Diff two runs with compare_results.py.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import bench_e2e
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def git_revision():
+    cwd = os.path.dirname(RESULTS_DIR)
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=cwd,
+                             capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=cwd,
+                               capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return "unknown"
+    return f"{sha}-dirty" if sha and dirty else sha or "unknown"
+
+
+def run(args):
+    skip = set(filter(None, args.skip.split(',')))
+    runs = 20 if args.quick else 200
+    e2e_runs = 3 if args.quick else 10
+    requests = 20 if args.quick else 100
+    # Before anything imports main, which reads its config at import time
+    bench_e2e.configure(args.fake_tex, pool=True)
+
+    import main
+    import bench_escape
+    import bench_templates
+    import loadgen
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "commit": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "tex": main.get_latex_version(),
+            "fake_tex": args.fake_tex,
+            "fake_tex_seconds": os.environ.get('FAKE_TEX_SECONDS') if args.fake_tex else None,
+            "quick": args.quick,
+        },
+    }
+    started = time.perf_counter()
+    if "micro" not in skip:
+        print("micro: escape", file=sys.stderr)
+        results["escape"] = bench_escape.measure(runs)
+        print("micro: templates", file=sys.stderr)
+        results["templates"] = bench_templates.measure(runs)
+    if "e2e" not in skip:
+        print("e2e", file=sys.stderr)
+        results["e2e"] = bench_e2e.measure(e2e_runs)
+    if "load" not in skip:
+        levels = [int(c) for c in args.concurrency.split(',')]
+        print(f"load: {levels} clients, {requests} requests each", file=sys.stderr)
+        results["load"] = {
+            "miss": loadgen.measure(levels, requests, unique=True, fake_tex=args.fake_tex),
+            "hit": loadgen.measure(levels, requests, unique=False, fake_tex=args.fake_tex),
+        }
+    results["meta"]["duration_s"] = round(time.perf_counter() - started, 1)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{results['meta']['commit']}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--quick', action='store_true', help='fewer runs, for a smoke check')
+    parser.add_argument('--fake-tex', action='store_true', help='compile with benchmarks/fakebin/pdflatex')
+    parser.add_argument('--skip', default='', help='comma separated sections to skip')
+    parser.add_argument('--concurrency', default='1,4,16')
+    parser.add_argument('--output', help='result file (default: benchmarks/results/)')
+    run(parser.parse_args())
@@ -0,0 +1,75 @@
+"""Compile many distinct resumes at once in threads and check each PDF is its own.
+
+Usage: python benchmarks/stress_concurrency.py [--jobs N] [--threads N]
+
+Every job gets a unique marker in its name field. The marker is looked up in
+the text extracted by pdftotext (poppler-utils), or in the raw PDF bytes when
+pdftotext is not installed. Exits non-zero if any PDF is missing or belongs to
+a different job.
+"""
+import argparse
+import copy
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from payloads import SAMPLE_RESUME  # noqa: E402
+
+
+def pdf_text(pdf_content):
+    if not shutil.which('pdftotext'):
+        return pdf_content.decode('latin-1')
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as f:
+        f.write(pdf_content)
+        f.flush()
+        result = subprocess.run(['pdftotext', f.name, '-'], capture_output=True, text=True)
+    return result.stdout
+
+
+def compile_one(index):
+    marker = f"Stress{index}x{uuid.uuid4().hex[:8]}"
+    data = copy.deepcopy(SAMPLE_RESUME)
+    data["name"] = marker
+    start = time.perf_counter()
+    pdf_content = main.generate_pdf(main.build_resume_latex(data))
+    elapsed = time.perf_counter() - start
+    if not pdf_content:
+        return marker, False, "no PDF", elapsed
+    text = pdf_text(pdf_content)
+    if marker not in text:
+        return marker, False, "PDF does not contain its own marker", elapsed
+    others = set(re.findall(r'Stress\d+x[0-9a-f]{8}', text)) - {marker}
+    if others:
+        return marker, False, f"PDF contains other jobs' markers: {sorted(others)[:3]}", elapsed
+    return marker, True, "", elapsed
+
+
+def run(jobs, threads):
+    main.warmup.wait()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(compile_one, range(jobs)))
+
+    failures = [r for r in results if not r[1]]
+    timings = sorted(r[3] for r in results)
+    print(f"{jobs} compiles on {threads} threads: {jobs - len(failures)} ok, {len(failures)} failed")
+    print(f"latency p50 {timings[len(timings) // 2] * 1000:.0f} ms, max {timings[-1] * 1000:.0f} ms")
+    for marker, _, reason, _ in failures:
+        print(f"  {marker}: {reason}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--jobs', type=int, default=48)
+    parser.add_argument('--threads', type=int, default=24)
+    args = parser.parse_args()
+    sys.exit(run(args.jobs, args.threads))
@@ -0,0 +1,70 @@
+import time
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger('rizzume')
+
+
+class CanaryMonitor:
+    """Runs a test compile in the background and caches the outcome for probes.
+
+    `check()` returns True when the compile pipeline works. Probes read the
+    cached state and never compile themselves.
+    """
+
+    def __init__(self, check, interval):
+        self.check = check
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._state = {"ok": None, "latency_seconds": None, "checked_at": None, "error": None}
+        self._checked_monotonic = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name='health-canary', daemon=True)
+        self._thread.start()
+
+    def run_once(self):
+        start = time.perf_counter()
+        error = None
+        try:
+            ok = bool(self.check())
+            if not ok:
+                error = "canary compile failed"
+        except Exception as e:
+            ok = False
+            error = str(e)
+        latency = time.perf_counter() - start
+        if not ok:
+            logger.error(f"Health canary failed after {latency:.2f}s: {error}")
+        with self._lock:
+            self._state = {
+                "ok": ok,
+                "latency_seconds": round(latency, 3),
+                "checked_at": datetime.now().isoformat(),
+                "error": error,
+            }
+            self._checked_monotonic = time.monotonic()
+        return ok
+
+    def state(self):
+        with self._lock:
+            state = dict(self._state)
+            checked = self._checked_monotonic
+        state["age_seconds"] = round(time.monotonic() - checked, 1) if checked else None
+        return state
+
+    def healthy(self):
+        """True if the last canary passed and is recent enough to trust"""
+        with self._lock:
+            ok = self._state["ok"]
+            checked = self._checked_monotonic
+        return bool(ok) and time.monotonic() - checked < 3 * self.interval
+
+    def _loop(self):
+        while True:
+            self.run_once()
+            time.sleep(self.interval)
@@ -0,0 +1,81 @@
+import os
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger('rizzume.escape')
+
+# Every character LaTeX treats specially in text mode, mapped to text that
+# typesets it literally. Braces in the replacements are never re-escaped
+# because the whole string is translated in one pass.
+LATEX_SPECIALS = {
+    '\\': r'\textbackslash{}',
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum{}',
+    '<': r'\textless{}',
+    '>': r'\textgreater{}',
+}
+_TRANSLATION = str.maketrans(LATEX_SPECIALS)
+
+# Short strings (dates, skills, locations) repeat across fields and requests;
+# long bullets rarely do and would only churn the memo
+MEMO_MAX_LENGTH = 64
+MEMO_SIZE = int(os.environ.get('LATEX_ESCAPE_MEMO_SIZE', 4096))
+
+
+def escape_latex(text):
+    """Escape LaTeX special characters in a single pass"""
+    if not isinstance(text, str):
+        text = "" if text is None else str(text)
+    if not text:
+        return ""
+    if len(text) <= MEMO_MAX_LENGTH:
+        return _escape_memo(text)
+    return text.translate(_TRANSLATION)
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _escape_memo(text):
+    return text.translate(_TRANSLATION)
+
+
+def plain_text(text):
+    """Normalise a payload value like escape_latex does, without escaping.
+
+    For HTML templates, which escape on output.
+    """
+    if not isinstance(text, str):
+        return "" if text is None else str(text)
+    return text
+
+
+def escape_payload(value, escape=escape_latex):
+    """Escape every string in a JSON payload in one traversal.
+
+    Dict keys are left alone since they are field names; callers that render
+    keys (like skill categories) escape them with `escape`. Other scalars
+    become strings and None becomes an empty string, matching escape_latex.
+    """
+    count = 0
+
+    def walk(item):
+        nonlocal count
+        if isinstance(item, str):
+            count += 1
+            return escape(item)
+        if isinstance(item, dict):
+            return {key: walk(child) for key, child in item.items()}
+        if isinstance(item, list):
+            return [walk(child) for child in item]
+        return escape(item)
+
+    escaped = walk(value)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Escaped {count} payload strings; memo {_escape_memo.cache_info()}")
+    return escaped
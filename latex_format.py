@@ -0,0 +1,146 @@
+import os
+import glob
+import hashlib
+import logging
+import shutil
+import subprocess
+import tempfile
+import threading
+from functools import lru_cache
+
+logger = logging.getLogger('rizzume')
+
+FORMAT_PREFIX = 'rizzume-'
+
+
+@lru_cache(maxsize=1)
+def _tex_fingerprint():
+    """Identify the TeX installation so formats are rebuilt after upgrades"""
+    parts = []
+    try:
+        result = subprocess.run(['pdflatex', '--version'], capture_output=True, text=True, timeout=30)
+        parts.append(result.stdout.split('\n')[0])
+    except Exception as e:
+        logger.error(f"Error probing pdflatex for format fingerprint: {str(e)}")
+        return None
+    try:
+        # The base LaTeX format changes whenever tlmgr/apt updates the kernel or packages
+        result = subprocess.run(['kpsewhich', '-engine=pdftex', 'pdflatex.fmt'],
+                                capture_output=True, text=True, timeout=30)
+        base_fmt = result.stdout.strip()
+        if base_fmt and os.path.exists(base_fmt):
+            stat = os.stat(base_fmt)
+            parts.append(f"{base_fmt}:{stat.st_size}:{int(stat.st_mtime)}")
+    except Exception as e:
+        logger.debug(f"kpsewhich unavailable, fingerprinting on version only: {str(e)}")
+    return '\n'.join(parts)
+
+
+class PreambleFormat:
+    """Dumped pdflatex format (.fmt) holding a fixed document preamble.
+
+    Documents that start with the preamble are compiled against the format so
+    pdflatex only has to process the body. The format name embeds a hash of the
+    preamble and the TeX installation, so changing either builds a new one.
+    """
+
+    def __init__(self, label, preamble, format_dir):
+        self.label = label
+        self.preamble = preamble
+        self.format_dir = format_dir
+        self._lock = threading.Lock()
+        self._name = None
+        self._failed_for = None
+
+    def fingerprint(self):
+        tex = _tex_fingerprint()
+        if tex is None:
+            return None
+        return hashlib.sha256((tex + '\n' + self.preamble).encode('utf-8')).hexdigest()[:16]
+
+    def path(self):
+        """Path of the current .fmt file, or None if no format is available"""
+        if self._name is None:
+            return None
+        fmt_path = os.path.join(self.format_dir, f"{self._name}.fmt")
+        return fmt_path if os.path.exists(fmt_path) else None
+
+    def split(self, latex_content):
+        """Return the document body if latex_content uses this preamble, else None"""
+        if latex_content.startswith(self.preamble):
+            return latex_content[len(self.preamble):]
+        return None
+
+    def compile_args(self):
+        """Extra pdflatex arguments and environment for compiling against the format"""
+        env = dict(os.environ)
+        # Trailing separator keeps the default kpathsea search path after ours
+        env['TEXFORMATS'] = self.format_dir + os.pathsep + env.get('TEXFORMATS', '')
+        return [f"-fmt={self._name}"], env
+
+    def ensure(self):
+        """Build the format if it is missing or stale. Returns True when usable."""
+        with self._lock:
+            if self.path():
+                return True
+            fingerprint = self.fingerprint()
+            if fingerprint is None:
+                return False
+            name = f"{FORMAT_PREFIX}{self.label}-{fingerprint}"
+            if self._failed_for == name:
+                return False
+            if os.path.exists(os.path.join(self.format_dir, f"{name}.fmt")):
+                self._name = name
+                return True
+            if self._build(name):
+                self._name = name
+                self._prune(name)
+                return True
+            self._failed_for = name
+            return False
+
+    def _build(self, name):
+        os.makedirs(self.format_dir, exist_ok=True)
+        build_dir = tempfile.mkdtemp(dir=self.format_dir)
+        try:
+            preamble_path = os.path.join(build_dir, 'preamble.tex')
+            with open(preamble_path, 'w', encoding='utf-8') as f:
+                f.write(self.preamble)
+                f.write('\n\\dump\n')
+
+            cmd = [
+                'pdflatex',
+                '-ini',
+                '-interaction=nonstopmode',
+                '-halt-on-error',
+                f"-jobname={name}",
+                f"-output-directory={build_dir}",
+                '&pdflatex',
+                preamble_path
+            ]
+            logger.info(f"Building LaTeX format: {' '.join(cmd)}")
+            result = subprocess.run(cmd, cwd=build_dir, capture_output=True, text=True, timeout=120)
+
+            built = os.path.join(build_dir, f"{name}.fmt")
+            if result.returncode != 0 or not os.path.exists(built):
+                logger.error(f"LaTeX format build failed with code {result.returncode}")
+                logger.debug(f"STDOUT: {result.stdout[-500:]}...")
+                return False
+
+            # Atomic rename so concurrent workers never load a half-written format
+            os.replace(built, os.path.join(self.format_dir, f"{name}.fmt"))
+            logger.info(f"LaTeX format ready: {name}.fmt")
+            return True
+        except Exception as e:
+            logger.error(f"Error building LaTeX format: {str(e)}")
+            return False
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+    def _prune(self, keep):
+        for stale in glob.glob(os.path.join(self.format_dir, f"{FORMAT_PREFIX}{self.label}-*.fmt")):
+            if os.path.basename(stale) != f"{keep}.fmt":
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
@@ -0,0 +1,49 @@
+import re
+
+# With -file-line-error pdflatex prints "./resume.tex:42: Undefined control sequence."
+FILE_LINE_ERROR = re.compile(r'^(?P<file>[^\s:][^:]*\.(?:tex|sty|cls|fmt)):(?P<line>\d+): (?P<message>.+)$')
+# Classic "! message" error followed later by "l.42 <context>"
+BANG_ERROR = re.compile(r'^! (?P<message>.+)$')
+LINE_MARKER = re.compile(r'^l\.(?P<line>\d+)')
+# Follow-on messages that carry no information about the cause
+CONSEQUENTIAL = {'Emergency stop.', '==> Fatal error occurred, no output PDF file produced!'}
+
+
+def parse_latex_errors(log_text, limit=3):
+    """Extract up to `limit` errors from a LaTeX .log as dicts of file, line, message"""
+    errors = []
+    pending = None
+    for raw_line in log_text.splitlines():
+        line = raw_line.rstrip()
+        match = FILE_LINE_ERROR.match(line)
+        if match:
+            errors.append({
+                "file": match.group('file'),
+                "line": int(match.group('line')),
+                "message": match.group('message').strip(),
+            })
+            pending = None
+        elif BANG_ERROR.match(line) and BANG_ERROR.match(line).group('message').strip() not in CONSEQUENTIAL:
+            pending = {"file": None, "line": None, "message": BANG_ERROR.match(line).group('message').strip()}
+            # -file-line-error reports the same error again with a location; avoid duplicates
+            if not errors or errors[-1]["message"] != pending["message"]:
+                errors.append(pending)
+            else:
+                pending = None
+        elif pending is not None and LINE_MARKER.match(line):
+            pending["line"] = int(LINE_MARKER.match(line).group('line'))
+            pending = None
+        if len(errors) >= limit and pending is None:
+            break
+    return errors[:limit]
+
+
+def summarize_latex_errors(log_text, limit=3):
+    """One-line summary of the first LaTeX errors, for logging"""
+    errors = parse_latex_errors(log_text, limit)
+    if not errors:
+        return "no error lines found in LaTeX log"
+    return '; '.join(
+        f"{e['file'] or '?'}:{e['line'] if e['line'] is not None else '?'}: {e['message']}"
+        for e in errors
+    )
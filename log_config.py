@@ -0,0 +1,81 @@
+import os
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+
+CONSOLE_FORMAT = '%(asctime)s.%(msecs)03d - %(name)s - %(levelname)s - %(process)d - %(message)s'
+FILE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Chatty per-field/per-compile loggers that get their own level and sampling rate
+NOISY_LOGGERS = {
+    'rizzume.escape': 'ESCAPE',
+    'rizzume.pdflatex': 'PDFLATEX',
+}
+
+
+class SamplingFilter(logging.Filter):
+    """Lets through a random fraction of records below WARNING"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def _level(name, default):
+    return getattr(logging, os.environ.get(name, default).upper(), logging.INFO)
+
+
+def configure_logging():
+    """Route all logging through a queue so request threads never block on I/O.
+
+    Records are handed to a background QueueListener that writes to stderr and
+    to a size-capped rotating log file. Levels and sampling come from env:
+    LOG_LEVEL, LOG_FILE, LOG_FILE_MAX_BYTES, LOG_FILE_BACKUPS, and for each
+    noisy logger LOG_LEVEL_<NAME> and LOG_SAMPLE_<NAME> (0.0-1.0).
+    """
+    level = _level('LOG_LEVEL', 'INFO')
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT, DATE_FORMAT))
+    handlers = [console_handler]
+
+    log_file = os.environ.get('LOG_FILE', 'rizzume.log')
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=int(os.environ.get('LOG_FILE_MAX_BYTES', 10 * 1024 * 1024)),
+            backupCount=int(os.environ.get('LOG_FILE_BACKUPS', 5)),
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(logging.Formatter(FILE_FORMAT))
+        handlers.append(file_handler)
+
+    # Unbounded so logging never blocks or drops on a slow disk
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    logger = logging.getLogger('rizzume')
+    logger.setLevel(level)
+
+    for name, suffix in NOISY_LOGGERS.items():
+        noisy = logging.getLogger(name)
+        noisy.setLevel(_level(f'LOG_LEVEL_{suffix}', 'WARNING'))
+        rate = float(os.environ.get(f'LOG_SAMPLE_{suffix}', 1.0))
+        if rate < 1.0:
+            noisy.addFilter(SamplingFilter(rate))
+
+    return logger
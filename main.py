@@ -1,97 +1,366 @@
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, request, send_file, send_from_directory, jsonify, url_for, redirect
 import os
-import subprocess
 import uuid
-import tempfile
 import traceback
 import sys
 import logging
 import shutil
-from io import BytesIO
+import time
+import io
+import re
+import hmac
+import hashlib
+import functools
+from collections import namedtuple
+from contextlib import contextmanager
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
 from flask_cors import CORS
 from datetime import datetime
+from resume_templates import TemplateRegistry, TEMPLATE_DIR
+from latex_escape import escape_latex, escape_payload, plain_text
+from render_engines import LatexEngine, HtmlEngine, LATEX, HTML
+from workspaces import WorkspacePool, Janitor, default_scratch_root
+import pdf_optimize
+import sandbox
+import autofit
+import tracing
+import profiling
+from validation import ValidationError, DEFAULT_LIMITS, validate_request_size, validate_resume, lint_latex
+from preview import PreviewSequencer, rasterize_first_page, convert_image, available_formats, MIMETYPES as PREVIEW_MIMETYPES
+from pdf_cache import PdfCache, cache_key
+from pdflatex_pool import WarmPool
+from pdf_jobs import JobQueue, QueueFull, DONE, FAILED
+from health import CanaryMonitor
+from warmup import Warmup, process_started
+from log_config import configure_logging
+from latex_log import summarize_latex_errors
+from metrics import REGISTRY, SIZE_BUCKETS, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s.%(msecs)03d - %(name)s - %(levelname)s - %(process)d - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-logger = logging.getLogger('rizzume')
-logger.setLevel(logging.DEBUG)
+# Cold start is measured from here, including interpreter startup and imports
+PROCESS_STARTED = process_started()
 
-# File handler for persistent logs
-file_handler = logging.FileHandler('rizzume.log')
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
+# Configure logging: queued, rotated, levels and sampling from env
+logger = configure_logging()
+pdflatex_logger = logging.getLogger('rizzume.pdflatex')
 
 app = Flask(__name__)
 CORS(app)  # Allow all domains
 
 # Configuration
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB limit
+# Resumes are a few KB of JSON; validation.py holds this and the per-field limits
+app.config['MAX_CONTENT_LENGTH'] = DEFAULT_LIMITS.max_request_bytes
 if os.name == 'nt':  # Windows
     TEMP_PDF_DIR = os.environ.get('TEMP_PDF_DIR', os.path.join(os.path.dirname(__file__), 'tmp', 'pdfs'))
 else:  # Unix/Linux
     TEMP_PDF_DIR = os.environ.get('TEMP_PDF_DIR', '/tmp/pdfs')
+RESULTS_DIR = os.path.join(TEMP_PDF_DIR, 'results')
+LATEX_FORMAT_DIR = os.environ.get('LATEX_FORMAT_DIR', os.path.join(TEMP_PDF_DIR, 'formats'))
+USE_LATEX_FORMAT = os.environ.get('USE_LATEX_FORMAT', '1') == '1'
+# Compile scratch space; RAM-backed by default so file churn stays off the volume
+SCRATCH_QUOTA_BYTES = int(os.environ.get('SCRATCH_QUOTA_MB', 256)) * 1024 * 1024
+SCRATCH_DIR = os.environ.get('SCRATCH_DIR') or default_scratch_root(os.path.join(TEMP_PDF_DIR, 'scratch'), SCRATCH_QUOTA_BYTES)
+# Per-request spans as JSON lines ('' turns tracing off), and on-demand profiles.
+# Profiling endpoints and the X-Profile header need X-Admin-Token: ADMIN_TOKEN.
+TRACE_FILE = os.environ.get('TRACE_FILE', os.path.join(TEMP_PDF_DIR, 'traces.jsonl'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(TEMP_PDF_DIR, 'profiles'))
+PROFILE_MAX_SECONDS = int(os.environ.get('PROFILE_MAX_SECONDS', 300))
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+# Keep the .tex, compile output and LaTeX log of failed compiles for inspection
+DEBUG_ARTIFACTS = os.environ.get('DEBUG_ARTIFACTS', '0') == '1'
+DEBUG_DIR = os.path.join(TEMP_PDF_DIR, 'debug')
+DEFAULT_TEMPLATE = os.environ.get('RESUME_TEMPLATE', 'classic')
+PDF_CACHE_ENABLED = os.environ.get('PDF_CACHE_ENABLED', '1') == '1'
+PDF_CACHE_SCHEMA = 1  # Bump when the pipeline changes output for identical LaTeX
+
+pdf_cache = PdfCache(
+    os.environ.get('PDF_CACHE_DIR', os.path.join(TEMP_PDF_DIR, 'cache')),
+    memory_bytes=int(os.environ.get('PDF_CACHE_MEMORY_MB', 32)) * 1024 * 1024,
+    disk_bytes=int(os.environ.get('PDF_CACHE_DISK_MB', 512)) * 1024 * 1024,
+    max_age=int(os.environ.get('PDF_CACHE_MAX_AGE', 7 * 24 * 3600))
+)
+# Published PDFs: immutable downloads at GET /pdf/<sha256 of the PDF>, for
+# clients that ask /generate-pdf for a link instead of the body. Entries are
+# kept PDF_LINK_MAX_AGE seconds after their last download, within a size cap.
+PDF_LINK_MAX_AGE = int(os.environ.get('PDF_LINK_MAX_AGE', 7 * 24 * 3600))
+published_pdfs = PdfCache(
+    os.environ.get('PDF_LINK_DIR', os.path.join(TEMP_PDF_DIR, 'published')),
+    memory_bytes=0,
+    disk_bytes=int(os.environ.get('PDF_LINK_DISK_MB', 1024)) * 1024 * 1024,
+    max_age=PDF_LINK_MAX_AGE
+)
+# Origin the links point at, e.g. the CDN in front of us; defaults to the request's host
+PUBLIC_BASE_URL = os.environ.get('PUBLIC_BASE_URL')
+# How /generate-pdf answers: the PDF itself, a JSON link to it or a 303 redirect
+RESPONSE_MODES = ('pdf', 'link', 'redirect')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+PUBLISHED_DIGEST = re.compile(r'[0-9a-f]{64}')
+PDF_JOB_WAIT_TIMEOUT = int(os.environ.get('PDF_JOB_WAIT_TIMEOUT', 60))
+PDF_JOB_RESULT_TTL = int(os.environ.get('PDF_JOB_RESULT_TTL', 300))
+# Global cap on simultaneous pdflatex runs; pdflatex is single threaded
+MAX_CONCURRENT_COMPILES = int(os.environ.get('MAX_CONCURRENT_COMPILES', os.cpu_count() or 1))
+
+# Render engines, chosen per template (template.json) or per request
+ENGINES = {
+    'pdflatex': LatexEngine('pdflatex', supports_formats=True),
+    'xelatex': LatexEngine('xelatex'),
+    'html': HtmlEngine(),
+}
+# Post-processing of finished PDFs (pdf_optimize.PRESETS); requests may pick another
+PDF_OPTIMIZE = os.environ.get('PDF_OPTIMIZE', pdf_optimize.OFF)
+if PDF_OPTIMIZE not in pdf_optimize.PRESETS:
+    logger.warning(f"Unknown PDF_OPTIMIZE preset {PDF_OPTIMIZE}, not optimising")
+    PDF_OPTIMIZE = pdf_optimize.OFF
+
+# Rendered source, the name of the engine that turns it into a PDF and the
+# optimisation preset applied afterwards. fit_key is set when the document is
+# auto-fitted to one page and names the resume across edits (see autofit).
+Document = namedtuple('Document', ['source', 'engine', 'optimize', 'fit_key'], defaults=[PDF_OPTIMIZE, None])
+
+# Last fitted compactness level per resume, where edited resumes start their search
+fitted_levels = autofit.FittedLevels(int(os.environ.get('AUTOFIT_MEMORY_ENTRIES', 10000)))
+
+# Live preview: page 1 as an image, on its own small compile budget so
+# keystroke traffic can't starve real downloads
+PREVIEW_DPI = int(os.environ.get('PREVIEW_DPI', 96))
+PREVIEW_MIN_DPI = 36
+PREVIEW_MAX_DPI = int(os.environ.get('PREVIEW_MAX_DPI', 200))
+PREVIEW_WAIT_TIMEOUT = int(os.environ.get('PREVIEW_WAIT_TIMEOUT', 15))
+preview_cache = PdfCache(
+    os.environ.get('PREVIEW_CACHE_DIR', os.path.join(TEMP_PDF_DIR, 'previews')),
+    memory_bytes=int(os.environ.get('PREVIEW_CACHE_MEMORY_MB', 16)) * 1024 * 1024,
+    disk_bytes=int(os.environ.get('PREVIEW_CACHE_DISK_MB', 128)) * 1024 * 1024,
+    max_age=int(os.environ.get('PREVIEW_CACHE_MAX_AGE', 24 * 3600)),
+    suffix='.img'
+)
+preview_sequencer = PreviewSequencer()
+
+workspace_pool = WorkspacePool(
+    os.path.join(SCRATCH_DIR, 'workspaces'),
+    max_free=int(os.environ.get('SCRATCH_POOL_SIZE', 8))
+)
+janitor = Janitor(
+    interval=int(os.environ.get('JANITOR_INTERVAL', 60)),
+    quota_bytes=SCRATCH_QUOTA_BYTES
+)
+janitor.watch_workspaces(workspace_pool, max_age=600)
+# Job results are deleted when their job expires; anything older leaked. They
+# are not scratch, and evicting one for space would break a job clients can
+# still download, so they stay out of the quota.
+janitor.watch_files(RESULTS_DIR, max_age=PDF_JOB_RESULT_TTL + 300, quota=False)
+janitor.watch_files(DEBUG_DIR, max_age=24 * 3600)
+
+# Metrics
+HTTP_REQUESTS = REGISTRY.counter('rizzume_http_requests_total', 'HTTP requests by endpoint and status code', ['endpoint', 'status'])
+PHASE_SECONDS = REGISTRY.histogram('rizzume_phase_seconds', 'Time spent in each stage of PDF generation', ['phase'])
+PDF_SIZE_BYTES = REGISTRY.histogram('rizzume_pdf_size_bytes', 'Size of generated PDFs', buckets=SIZE_BUCKETS)
+COMPILES = REGISTRY.counter('rizzume_compiles_total', 'pdflatex compiles by outcome (success, failure, timeout, cpu_limit, memory_limit, output_limit, open_files_limit, killed)', ['outcome'])
+COMPILES_IN_FLIGHT = REGISTRY.gauge('rizzume_compiles_in_flight', 'Compiles currently running, any engine')
+RENDER_SECONDS = REGISTRY.histogram('rizzume_render_seconds', 'Source-to-PDF render time per engine', ['engine'])
+PDF_BYTES_SAVED = REGISTRY.histogram('rizzume_pdf_bytes_saved', 'Bytes removed from each PDF by the optimisation stage', ['preset'],
+                                     buckets=(1_000, 5_000) + SIZE_BUCKETS)
+PREVIEWS = REGISTRY.counter('rizzume_previews_total', 'Preview requests by outcome (cached, rendered, superseded, failed)', ['outcome'])
+REJECTED = REGISTRY.counter('rizzume_rejected_requests_total', 'Payloads refused before rendering (invalid, too_large, lint)', ['reason'])
+AUTOFITS = REGISTRY.counter('rizzume_autofits_total', 'One-page auto-fit searches by result (fitted, overflow)', ['result'])
+AUTOFIT_CANDIDATES = REGISTRY.histogram('rizzume_autofit_candidates', 'Layouts compiled or fetched from cache per auto-fit search',
+                                        buckets=(1, 2, 3, 4, 5, 6))
+@contextmanager
+def stage(phase):
+    """Time one stage of PDF generation into PHASE_SECONDS and the request's trace"""
+    with tracing.span(phase), PHASE_SECONDS.time(phase=phase):
+        yield
+
+def record_stage(phase, started, seconds, parent=None):
+    """stage() for a stage timed by hand; started is a time.time() value"""
+    PHASE_SECONDS.observe(seconds, phase=phase)
+    tracing.record(phase, started, seconds, parent)
+
+COLD_START_SECONDS = REGISTRY.gauge('rizzume_cold_start_seconds', 'Seconds from process start until startup warm-up finished')
+WARMUP_STEP_SECONDS = REGISTRY.gauge('rizzume_warmup_step_seconds', 'Duration of each startup warm-up step', ['step'])
 
 def setup_environment():
-    """Ensure required directories exist"""
+    """Ensure required directories exist and start warming up in the background"""
     os.makedirs(TEMP_PDF_DIR, exist_ok=True)
-    logger.info(f"Environment setup complete. Temp PDF dir: {TEMP_PDF_DIR}")
-    logger.info(f"LaTeX version: {get_latex_version()}")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    os.makedirs(workspace_pool.root, exist_ok=True)
+    tracing.configure(TRACE_FILE, max_bytes=int(os.environ.get('TRACE_FILE_MAX_BYTES', 50 * 1024 * 1024)))
+    janitor.run_once()
+    janitor.start()
+    logger.info(f"Environment setup complete. Temp PDF dir: {TEMP_PDF_DIR}, scratch dir: {SCRATCH_DIR}")
+    # Requests are accepted straight away; readiness holds traffic off until warm
+    pdf_jobs.start()
+    preview_jobs.start()
+    warmup.start()
+
+def probe_engines():
+    """Warm-up: run every engine's version probe once (cached for the process)"""
+    for engine in ENGINES.values():
+        logger.info(f"Render engine {engine.name}: {engine.version() if engine.available() else 'not available'}")
+
+def prepare_formats():
+    """Warm-up: build or load each template's preamble format, then park pdflatex workers"""
+    if USE_LATEX_FORMAT:
+        for template in resume_templates:
+            if template.format is None:
+                continue
+            if template.format.ensure():
+                logger.info(f"Using precompiled preamble format for {template.name}: {template.format.path()}")
+            else:
+                logger.warning(f"Precompiled preamble format unavailable for {template.name}, compiling full documents")
+        if resume_format.path():
+            pdflatex_pool.start()
+
+# Touches every section of the templates, so the warm-up compile loads the
+# same packages and fonts a real resume does
+WARMUP_RESUME = {
+    "name": "Warm Up",
+    "phone": "555-000-0000",
+    "email": "warmup@example.com",
+    "linkedin": "warmup",
+    "github": "warmup",
+    "education": [{"institution": "University", "location": "City", "degree": "B.S.", "dates": "2020 -- 2024"}],
+    "experience": [{"position": "Engineer", "dates": "2024 -- Present", "company": "Company", "location": "Remote",
+                    "bullets": ["Shipped 100% of the things & more"]}],
+    "projects": [{"name": "Project", "technologies": "Python, LaTeX", "dates": "2024", "bullets": ["Built it"]}],
+    "skills": {"Languages": ["Python", "C++"]},
+}
+WARMUP_COMPILE = os.environ.get('WARMUP_COMPILE', '1') == '1'
+
+def warm_compile():
+    """Warm-up: compile every LaTeX template once, loading kpathsea's file
+    database, font maps and package files into the page cache before the first
+    real request has to.
+    
+    Every other available LaTeX engine (xelatex) compiles the default template
+    once too, since requests may pick it: its first run scans the system fonts
+    and builds the fontconfig cache, which takes seconds.
+    """
+    if not WARMUP_COMPILE:
+        return True
+    runs = [(template.name, template.engine) for template in resume_templates if template.source_type == LATEX]
+    warmed = {engine_name for _, engine_name in runs}
+    runs += [(DEFAULT_TEMPLATE, engine.name) for engine in ENGINES.values()
+             if engine.source_type == LATEX and engine.name not in warmed]
+    ok = True
+    for template_name, engine_name in runs:
+        if not ENGINES[engine_name].available():
+            continue
+        output_path = os.path.join(RESULTS_DIR, f"warmup-{uuid.uuid4().hex}.pdf")
+        if render_document(build_resume_document(WARMUP_RESUME, template_name, engine_name), output_path):
+            os.remove(output_path)
+        else:
+            logger.warning(f"Warm-up compile of {template_name} with {engine_name} failed")
+            ok = False
+    return ok
+
+def record_cold_start(seconds, steps):
+    COLD_START_SECONDS.set(seconds)
+    for name, result in steps.items():
+        WARMUP_STEP_SECONDS.set(result["seconds"], step=name)
 
 def get_latex_version():
-    """Get installed LaTeX version"""
-    try:
-        result = subprocess.run(['pdflatex', '--version'], capture_output=True, text=True)
-        return result.stdout.split('\n')[0] if result.returncode == 0 else "Not available"
-    except Exception as e:
-        logger.error(f"Error getting LaTeX version: {str(e)}")
-        return "Error"
-
-def escape_latex(text):
-    """Enhanced LaTeX escaping with logging"""
-    if not text:
-        return ""
-    
-    original_text = text
-    replacements = {
-        '\\': r'\\textbackslash{}',
-        '&': r'\&',
-        '%': r'\%',
-        '$': r'\$',
-        '#': r'\#',
-        '_': r'\_',
-        '{': r'\{',
-        '}': r'\}',
-        '~': r'\textasciitilde{}',
-        '^': r'\textasciicircum{}',
-        '<': r'\textless{}',
-        '>': r'\textgreater{}'
+    """Get installed LaTeX version (probed once per process)"""
+    return ENGINES['pdflatex'].version()
+
+# Compiled once at import; each template has its own dumped preamble format
+resume_templates = TemplateRegistry(TEMPLATE_DIR, LATEX_FORMAT_DIR)
+if resume_templates.get(DEFAULT_TEMPLATE) is None:
+    raise RuntimeError(f"Default resume template {DEFAULT_TEMPLATE!r} not found in {TEMPLATE_DIR}")
+# Warm workers are parked on the default template's format only
+resume_format = resume_templates.get(DEFAULT_TEMPLATE).format
+pdflatex_pool = WarmPool(
+    resume_format,
+    os.path.join(SCRATCH_DIR, 'pool'),
+    size=int(os.environ.get('PDFLATEX_POOL_SIZE', 2)),
+    max_idle=int(os.environ.get('PDFLATEX_POOL_MAX_IDLE', 600))
+)
+
+def resume_context(data, escape=escape_latex):
+    """Escape a resume payload into the variables the templates expect"""
+    data = escape_payload(data, escape)
+    return {
+        "name": data.get("name", "Your Name"),
+        "phone": data.get("phone", "123-456-7890"),
+        "email": data.get("email", "example@email.com"),
+        "linkedin": data.get("linkedin", ""),
+        "github": data.get("github", ""),
+        "education": [
+            {field: edu.get(field, "") for field in ("institution", "location", "degree", "dates")}
+            for edu in data.get("education", [])
+        ],
+        "experience": [
+            {
+                **{field: exp.get(field, "") for field in ("position", "dates", "company", "location")},
+                "bullets": exp.get("bullets", [])
+            }
+            for exp in data.get("experience", [])
+        ],
+        "projects": [
+            {
+                **{field: proj.get(field, "") for field in ("name", "technologies", "dates")},
+                "bullets": proj.get("bullets", [])
+            }
+            for proj in data.get("projects", [])
+        ],
+        # Category names are keys, which escape_payload leaves alone
+        "skills": [
+            (escape(category), ", ".join(items))
+            for category, items in data.get("skills", {}).items()
+        ],
     }
-    
-    for char, replacement in replacements.items():
-        text = text.replace(char, replacement)
-    
-    if original_text != text:
-        logger.debug(f"Escaped LaTeX special chars in: {original_text[:50]}...")
-    
-    return text
 
-def generate_pdf(latex_content):
-    """Generate PDF from LaTeX content with robust error handling"""
+def build_resume_document(data, template_name=DEFAULT_TEMPLATE, engine_name=None, optimize=PDF_OPTIMIZE):
+    """Render a resume payload with a template, for its default engine unless one is given"""
+    template = resume_templates.get(template_name)
+    # HTML templates escape on output, so they get the raw (normalised) values
+    with tracing.span('escape'):
+        context = resume_context(data, escape_latex if template.source_type == LATEX else plain_text)
+    with tracing.span('template', template=template.name):
+        source = template.render(context)
+    return Document(source, engine_name or template.engine, optimize)
+
+def build_resume_latex(data, template_name=DEFAULT_TEMPLATE):
+    """Build the full LaTeX document for a resume payload"""
+    return build_resume_document(data, template_name).source
+
+@tracing.traced('generate_pdf')
+def generate_pdf(latex_content, output_path=None, engine=None):
+    """Generate PDF from LaTeX content with robust error handling.
+    
+    Runs pdflatex unless another LatexEngine is given. Returns the PDF bytes,
+    or with output_path moves the PDF there without reading it and returns
+    output_path. Returns None on failure. Raises sandbox.LimitExceeded when
+    the compile timed out or broke one of its resource limits.
+    """
+    engine = engine or ENGINES['pdflatex']
     temp_dir = None
+    worker = None
+    outcome = 'failure'
+    COMPILES_IN_FLIGHT.inc()
+    phase_started = time.time()
+    phase_start = time.perf_counter()
     try:
-        # Create a dedicated temp directory
-        temp_dir = tempfile.mkdtemp(dir=TEMP_PDF_DIR)
-        logger.info(f"Created temp directory: {temp_dir}")
-        logger.debug(f"Directory writable: {os.access(temp_dir, os.W_OK)}")
+        # Compile only the body against the dumped preamble when possible
+        format_args, env = [], None
+        use_format = USE_LATEX_FORMAT and engine.supports_formats
+        preamble_format = resume_templates.format_for(latex_content) if use_format else None
+        body = preamble_format.split(latex_content) if preamble_format else None
+        if body is not None and preamble_format.ensure():
+            format_args, env = preamble_format.compile_args()
+            if preamble_format is pdflatex_pool.preamble_format:
+                # Parked workers have already started up and loaded the format
+                worker = pdflatex_pool.acquire()
+        else:
+            body = latex_content
         
-        # Generate unique filenames
-        unique_id = str(uuid.uuid4())[:8]
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_filename = f"resume_{timestamp}_{unique_id}"
+        if worker:
+            temp_dir = worker.workspace
+            base_filename = worker.jobname
+            logger.info(f"Using warm pdflatex worker in {temp_dir}")
+        else:
+            # Workspaces are exclusive to one compile, so the file name can be fixed
+            temp_dir = workspace_pool.acquire()
+            base_filename = "resume"
+            logger.info(f"Using scratch workspace: {temp_dir}")
         tex_filename = f"{base_filename}.tex"
         pdf_filename = f"{base_filename}.pdf"
         
@@ -101,48 +370,45 @@ def generate_pdf(latex_content):
         # Write LaTeX content
         logger.info(f"Writing LaTeX to {tex_path}")
         with open(tex_path, 'w', encoding='utf-8') as f:
-            f.write(latex_content)
-        
-        # Save debug copy
-        debug_path = os.path.join(temp_dir, "debug.tex")
-        with open(debug_path, 'w') as f:
-            f.write(latex_content)
+            f.write(body)
         
-        # Compile LaTeX
-        current_dir = os.getcwd()
-        os.chdir(temp_dir)
-        logger.info(f"Changed to directory: {temp_dir}")
+        record_stage('tempdir_setup', phase_started, time.perf_counter() - phase_start)
         
-        cmd = [
-            'pdflatex',
-            '-interaction=nonstopmode',
-            '-halt-on-error',
-            '-file-line-error',
-            tex_filename
-        ]
+        # Compile LaTeX. Every path is explicit and the child gets its own cwd,
+        # so concurrent compiles in threads never share process state. It runs
+        # in its own process group under sandbox.DEFAULT_LIMITS.
+        cmd = engine.command(tex_path, temp_dir, format_args)
         
-        logger.info(f"Executing: {' '.join(cmd)}")
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=30  # 30 seconds timeout
-        )
+        with stage(engine.name):
+            if worker:
+                logger.info(f"Releasing warm pdflatex worker on {tex_filename}")
+                result = worker.run(timeout=30)
+            else:
+                logger.info(f"Executing: {' '.join(cmd)}")
+                result = sandbox.run(cmd, timeout=30, cwd=temp_dir, env=env)
         
-        # Save compilation logs
-        with open(os.path.join(temp_dir, 'compile.log'), 'w') as f:
-            f.write(f"STDOUT:\n{result.stdout}\n\nSTDERR:\n{result.stderr}")
+        if DEBUG_ARTIFACTS:
+            with open(os.path.join(temp_dir, 'debug.tex'), 'w', encoding='utf-8') as f:
+                f.write(latex_content)
+            with open(os.path.join(temp_dir, 'compile.log'), 'w', encoding='utf-8') as f:
+                f.write(f"STDOUT:\n{result.stdout}\n\nSTDERR:\n{result.stderr}")
         
-        logger.info(f"pdflatex return code: {result.returncode}")
-        logger.debug(f"STDOUT: {result.stdout[:200]}...")
-        logger.debug(f"STDERR: {result.stderr[:200]}...")
+        logger.info(f"{engine.name} return code: {result.returncode}")
+        pdflatex_logger.debug(f"STDOUT: {result.stdout[:200]}...")
+        pdflatex_logger.debug(f"STDERR: {result.stderr[:200]}...")
         
         # Check output
         if result.returncode != 0:
-            logger.error(f"pdflatex failed with code {result.returncode}")
-            if os.path.exists(f"{base_filename}.log"):
-                with open(f"{base_filename}.log", 'r') as f:
-                    logger.error(f"LaTeX log:\n{f.read()}")
+            log_path = os.path.join(temp_dir, f"{base_filename}.log")
+            summary = "no LaTeX log written"
+            if os.path.exists(log_path):
+                with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+                    log_text = f.read()
+                summary = summarize_latex_errors(log_text)
+                pdflatex_logger.debug(f"LaTeX log:\n{log_text}")
+            logger.error(f"{engine.name} failed with code {result.returncode}: {summary}")
+            if DEBUG_ARTIFACTS:
+                keep_debug_artifacts(temp_dir)
             return None
         
         if not os.path.exists(pdf_path):
@@ -154,239 +420,632 @@ def generate_pdf(latex_content):
             logger.error("Generated PDF is too small (likely invalid)")
             return None
         
+        if output_path:
+            PDF_SIZE_BYTES.observe(os.path.getsize(pdf_path))
+            # Scratch may be tmpfs, so this can be a copy rather than a rename
+            shutil.move(pdf_path, output_path)
+            logger.info(f"PDF generated successfully: {output_path}")
+            outcome = 'success'
+            return output_path
+        
         # Read PDF content
-        with open(pdf_path, 'rb') as f:
-            pdf_content = f.read()
+        with stage('pdf_read'):
+            with open(pdf_path, 'rb') as f:
+                pdf_content = f.read()
         
         logger.info(f"PDF generated successfully. Size: {len(pdf_content)} bytes")
+        outcome = 'success'
+        PDF_SIZE_BYTES.observe(len(pdf_content))
         return pdf_content
         
-    except subprocess.TimeoutExpired:
-        logger.error("LaTeX compilation timed out after 30 seconds")
-        return None
+    except sandbox.LimitExceeded as e:
+        logger.error(f"LaTeX compilation stopped ({e.reason}, {e.detail})")
+        outcome = e.reason
+        raise
     except Exception as e:
         logger.error(f"Error in generate_pdf: {str(e)}")
         logger.error(traceback.format_exc())
         return None
     finally:
-        try:
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-                logger.info(f"Cleaned up temp directory: {temp_dir}")
-        except Exception as e:
-            logger.error(f"Error cleaning up temp directory: {str(e)}")
-        
-        if 'current_dir' in locals():
-            os.chdir(current_dir)
+        COMPILES_IN_FLIGHT.dec()
+        COMPILES.inc(outcome=outcome)
+        if worker:
+            worker.discard()
+        elif temp_dir:
+            workspace_pool.release(temp_dir)
+
+def keep_debug_artifacts(workspace):
+    """Copy a failed compile's workspace to DEBUG_DIR (pruned by the janitor)"""
+    target = os.path.join(DEBUG_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}")
+    try:
+        shutil.copytree(workspace, target)
+        logger.info(f"Kept debug artifacts in {target}")
+    except OSError as e:
+        logger.error(f"Error keeping debug artifacts: {str(e)}")
+
+def generate_html_pdf(html_content, output_path, engine):
+    """Render an HTML document to output_path with an HtmlEngine. Returns output_path or None."""
+    outcome = 'failure'
+    COMPILES_IN_FLIGHT.inc()
+    try:
+        with stage(engine.name):
+            if not engine.render(html_content, output_path):
+                return None
+        PDF_SIZE_BYTES.observe(os.path.getsize(output_path))
+        logger.info(f"PDF generated successfully: {output_path}")
+        outcome = 'success'
+        return output_path
+    finally:
+        COMPILES_IN_FLIGHT.dec()
+        COMPILES.inc(outcome=outcome)
+
+def render_document(document, output_path):
+    """Turn a Document into a PDF at output_path with its engine. Returns output_path or None."""
+    engine = ENGINES[document.engine]
+    with RENDER_SECONDS.time(engine=engine.name):
+        if engine.source_type == HTML:
+            rendered = generate_html_pdf(document.source, output_path, engine)
+        else:
+            rendered = generate_pdf(document.source, output_path=output_path, engine=engine)
+    if rendered and document.optimize != pdf_optimize.OFF:
+        optimize_output(output_path, document.optimize)
+    return rendered
+
+def optimize_output(output_path, preset):
+    """Shrink a rendered PDF in place with Ghostscript. Failures keep the original."""
+    if not pdf_optimize.available():
+        logger.debug(f"Skipping PDF optimisation ({preset}): Ghostscript not installed")
+        return
+    with stage('optimize'):
+        sizes = pdf_optimize.optimize_pdf(output_path, preset)
+    record_optimization(preset, sizes)
+
+def record_optimization(preset, sizes):
+    if sizes is None:
+        return
+    before, after = sizes
+    PDF_BYTES_SAVED.observe(before - after, preset=preset)
+    logger.info(f"Optimised PDF with {preset}: {before} -> {after} bytes")
+
+CANARY_LATEX = r"""\documentclass{article}\begin{document}Test PDF\end{document}"""
+
+def run_canary():
+    """Background test compile whose result the health probes report"""
+    return generate_pdf(CANARY_LATEX) is not None
+
+canary = CanaryMonitor(run_canary, interval=int(os.environ.get('HEALTH_CANARY_INTERVAL', 60)))
+
+warmup = Warmup([
+    ('engine_versions', probe_engines),
+    ('formats', prepare_formats),
+    ('compile', warm_compile),
+    # Last, so the first canary doesn't compete with the warm-up compiles
+    ('canary', canary.start),
+], PROCESS_STARTED, on_finish=record_cold_start)
 
 @app.route("/health")
 def health_check():
-    """Enhanced health check with system diagnostics"""
+    """System diagnostics from cached state; never compiles on the request path"""
+    canary_state = canary.state()
+    if canary_state["ok"] is None:
+        test_pdf = "pending"
+    else:
+        test_pdf = "success" if canary_state["ok"] else "failed"
+    
     health_data = {
-        "status": "healthy",
+        "status": "healthy" if canary.healthy() else "degraded",
         "timestamp": datetime.now().isoformat(),
         "system": {
             "latex": get_latex_version(),
             "python": sys.version,
             "disk_space": shutil.disk_usage("/").free,
             "temp_dir_writable": os.access(TEMP_PDF_DIR, os.W_OK)
-        }
+        },
+        "test_pdf": test_pdf,
+        "canary": canary_state,
+        "warmup": warmup.state(),
+        "pdf_cache": pdf_cache.stats(),
+        "published_pdfs": published_pdfs.stats(),
+        "templates": resume_templates.names(),
+        "engines": {
+            name: engine.version() if engine.available() else "not available"
+            for name, engine in ENGINES.items()
+        },
+        "pdf_optimize": {
+            "default": PDF_OPTIMIZE,
+            "presets": list(pdf_optimize.PRESETS),
+            "ghostscript": pdf_optimize.available()
+        },
+        "pdflatex_pool": pdflatex_pool.stats(),
+        "scratch": {**workspace_pool.stats(), "janitor": janitor.stats()},
+        "pdf_jobs": pdf_jobs.stats(),
+        "preview_cache": preview_cache.stats(),
+        "preview_jobs": preview_jobs.stats()
     }
     
-    # Test PDF generation
+    return jsonify(health_data)
+
+@app.route("/health/live")
+def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({"status": "alive"})
+
+@app.route("/health/ready")
+def readiness_check():
+    """Readiness probe: warm-up has finished and the last canary compile passed recently"""
+    ready = warmup.ready() and canary.healthy() and os.access(TEMP_PDF_DIR, os.W_OK)
+    return jsonify({
+        "status": "ready" if ready else "not ready",
+        "warmup": warmup.state(),
+        "canary": canary.state()
+    }), 200 if ready else 503
+
+# A compiled PDF on disk, or in memory (content, no path) for memory-cache hits.
+# Ephemeral files are not owned by the cache and are deleted once served (or
+# when their job expires).
+CompiledPdf = namedtuple('CompiledPdf', ['path', 'etag', 'ephemeral', 'content'], defaults=(None,))
+
+def pdf_etag(document):
+    """Content hash that identifies the PDF a document renders to.
+    
+    It hashes the source and pipeline, not the output: pdflatex stamps a new
+    /CreationDate and /ID into every compile, so two compiles of one document
+    are equivalent but not byte-identical. Responses send it as a weak ETag.
+    """
+    engine = ENGINES[document.engine]
+    pipeline = f"{PDF_CACHE_SCHEMA}|{engine.name}|{engine.version()}"
+    if document.optimize != pdf_optimize.OFF:
+        pipeline += f"|{document.optimize}"
+    if document.fit_key:
+        pipeline += f"|{autofit.ONE_PAGE}"
+    return cache_key(document.source, pipeline)
+
+def lookup_cached_pdf(etag):
+    """Return a CompiledPdf for a cached document from either tier, or None.
+    
+    Memory hits have content and no path; callers that need a file use
+    cached_pdf_file.
+    """
+    if not PDF_CACHE_ENABLED:
+        return None
+    pdf_content = pdf_cache.get_memory(etag)
+    if pdf_content is not None:
+        logger.info(f"PDF memory cache hit: {etag[:12]}")
+        return CompiledPdf(None, etag, False, pdf_content)
+    return cached_pdf_file(etag)
+
+def cached_pdf_file(etag):
+    """Return a file-backed CompiledPdf from the disk tier, or None"""
+    if not PDF_CACHE_ENABLED:
+        return None
+    path = pdf_cache.get_path(etag)
+    if path:
+        logger.info(f"PDF cache hit: {etag[:12]}")
+        return CompiledPdf(path, etag, False)
+    return None
+
+def compile_resume_pdf(document):
+    """Job handler: compile through the cache. Returns a CompiledPdf or None."""
+    etag = pdf_etag(document)
+    # Fitting and previews read the PDF from a path
+    compiled = cached_pdf_file(etag)
+    if compiled:
+        return compiled
+    if document.fit_key:
+        return compile_fitted_pdf(document, etag)
+    
+    logger.info("Starting PDF generation")
+    output_path = os.path.join(RESULTS_DIR, f"{uuid.uuid4().hex}.pdf")
+    if not render_document(document, output_path):
+        return None
+    if PDF_CACHE_ENABLED:
+        return CompiledPdf(pdf_cache.put_file(etag, output_path), etag, False)
+    return CompiledPdf(output_path, etag, True)
+
+def fit_candidate(document, level):
+    """The plain document an auto-fit search compiles for one compactness level.
+    
+    Candidates skip the optimisation stage; only the chosen one is optimised.
+    """
+    return document._replace(source=autofit.apply(document.source, level), optimize=pdf_optimize.OFF, fit_key=None)
+
+def record_fit(document, level, pages, candidates):
+    """Remember the level a resume was fitted at and report the search"""
+    fitted_levels.put(document.fit_key, level)
+    AUTOFIT_CANDIDATES.observe(candidates)
+    if pages is not None and pages > 1:
+        AUTOFITS.inc(result='overflow')
+        logger.warning(f"Auto-fit could not get below {pages} pages, using the tightest layout")
+    else:
+        AUTOFITS.inc(result='fitted')
+        logger.info(f"Auto-fit chose level {level} after {candidates} candidates")
+
+def compile_fitted_pdf(document, etag):
+    """Compile a one-page auto-fit document. Returns a CompiledPdf or None.
+    
+    autofit.search picks the compactness levels to try from page counts.
+    Each candidate goes through compile_resume_pdf, so with the PDF cache on
+    no layout of the same source is compiled twice.
+    """
+    search = autofit.search(fitted_levels.get(document.fit_key) or 0)
+    candidates = {}
+    pages = {}
+    chosen = None
     try:
-        test_content = r"""\documentclass{article}\begin{document}Test PDF\end{document}"""
-        pdf = generate_pdf(test_content)
-        health_data["test_pdf"] = "success" if pdf else "failed"
-    except Exception as e:
-        health_data["test_pdf"] = f"error: {str(e)}"
+        level = next(search)
+        while True:
+            compiled = compile_resume_pdf(fit_candidate(document, level))
+            if not compiled:
+                return None
+            candidates[level] = compiled
+            with open(compiled.path, 'rb') as f:
+                pages[level] = autofit.pdf_pages(f.read())
+            if pages[level] is None:
+                logger.warning(f"Auto-fit could not count the pages of level {level}, stopping there")
+                chosen = level
+                break
+            level = search.send(pages[level])
+    except StopIteration as stop:
+        chosen = stop.value
+    finally:
+        for level, compiled in candidates.items():
+            if level != chosen:
+                discard_compiled(compiled)
+    record_fit(document, chosen, pages[chosen], len(candidates))
     
-    return jsonify(health_data)
+    compiled = candidates[chosen]
+    if compiled.ephemeral:
+        output_path = compiled.path
+    else:
+        output_path = os.path.join(RESULTS_DIR, f"{uuid.uuid4().hex}.pdf")
+        shutil.copyfile(compiled.path, output_path)
+    if document.optimize != pdf_optimize.OFF:
+        optimize_output(output_path, document.optimize)
+    if PDF_CACHE_ENABLED:
+        return CompiledPdf(pdf_cache.put_file(etag, output_path), etag, False)
+    return CompiledPdf(output_path, etag, True)
+
+def discard_compiled(compiled):
+    """Delete a PDF that the cache does not own"""
+    if compiled.ephemeral:
+        try:
+            os.remove(compiled.path)
+        except FileNotFoundError:
+            pass
+
+def job_handler(handler):
+    """Wrap a job handler in a span and the submitting request's profile, if any"""
+    @functools.wraps(handler)
+    def run(item):
+        with tracing.span(handler.__name__), profiling.profiled():
+            return handler(item)
+    return run
+
+# Every compile, synchronous or not, runs on this queue
+pdf_jobs = JobQueue(
+    job_handler(compile_resume_pdf),
+    workers=MAX_CONCURRENT_COMPILES,
+    max_queued=int(os.environ.get('PDF_JOB_QUEUE_SIZE', 8)),
+    result_ttl=PDF_JOB_RESULT_TTL,
+    max_wait=float(os.environ.get('PDF_MAX_QUEUE_WAIT', 20)),
+    on_expire=discard_compiled
+)
+
+REGISTRY.gauge('rizzume_job_queue_depth', 'Compile jobs waiting for a worker', callback=pdf_jobs.depth)
+REGISTRY.gauge('rizzume_job_queue_running', 'Compile jobs being worked on', callback=lambda: pdf_jobs.stats()["running"])
+REGISTRY.counter('rizzume_job_rejected_total', 'Jobs refused or shed by admission control',
+                 callback=lambda: pdf_jobs.stats()["rejected"] + pdf_jobs.stats()["shed"])
+REGISTRY.counter('rizzume_compiles_coalesced_total', 'Compiles saved by joining an identical in-flight job',
+                 callback=lambda: pdf_jobs.stats()["coalesced"])
+REGISTRY.counter('rizzume_pdf_cache_hits_total', 'PDF cache hits in either tier',
+                 callback=lambda: pdf_cache.stats()["memory_hits"] + pdf_cache.stats()["disk_hits"])
+REGISTRY.counter('rizzume_pdf_cache_misses_total', 'PDF cache misses', callback=lambda: pdf_cache.stats()["misses"])
+REGISTRY.gauge('rizzume_pdflatex_pool_parked', 'Warm pdflatex workers ready to serve', callback=lambda: pdflatex_pool.stats()["parked"])
+
+def rejected(e):
+    """Error response for a payload refused by validation or lint"""
+    logger.warning(f"Rejected resume payload ({e.reason}): {str(e)}")
+    REJECTED.inc(reason=e.reason)
+    return jsonify(e.to_dict()), e.status
+
+def prepare_document(data, template_name=None, engine_name=None, optimize=None, fit=None):
+    """Validate a parsed payload and render its source, independent of the web framework.
+    
+    Template, engine, optimisation preset and fit mode default to the payload's
+    fields, then the template's own engine, PDF_OPTIMIZE and no fitting.
+    Returns a Document; raises ValidationError if it is refused.
+    """
+    with stage('validate'):
+        validate_resume(data)
+    logger.debug(f"Request data keys: {list(data.keys())}")
+    
+    template_name = template_name or data.get('template') or DEFAULT_TEMPLATE
+    template = resume_templates.get(template_name)
+    if template is None:
+        raise ValidationError(f"Unknown template: {template_name}", 'template',
+                              details={"templates": resume_templates.names()})
+    
+    engine_name = engine_name or data.get('engine') or template.engine
+    engine = ENGINES.get(engine_name)
+    if engine is None or engine.source_type != template.source_type or not engine.available():
+        raise ValidationError(f"Engine {engine_name} is not available for template {template_name}", 'engine', details={
+            "engines": [e.name for e in ENGINES.values() if e.source_type == template.source_type and e.available()]
+        })
+    
+    optimize = optimize or data.get('optimize') or PDF_OPTIMIZE
+    if optimize not in pdf_optimize.PRESETS:
+        raise ValidationError(f"Unknown optimisation preset: {optimize}", 'optimize',
+                              details={"presets": list(pdf_optimize.PRESETS)})
+    
+    fit = fit or data.get('fit') or autofit.OFF
+    if fit not in autofit.MODES:
+        raise ValidationError(f"Unknown fit mode: {fit}", 'fit', details={"modes": list(autofit.MODES)})
+    if fit != autofit.OFF and template.source_type != LATEX:
+        raise ValidationError(f"Template {template_name} does not support auto-fit", 'fit')
+    
+    with stage('latex_build'):
+        document = build_resume_document(data, template_name, engine_name, optimize)
+    if fit != autofit.OFF:
+        # Stable across edits to the content, so a re-fit starts from the last level
+        identity = '|'.join(str(data.get(field) or '') for field in ('name', 'email', 'phone'))
+        document = document._replace(fit_key=cache_key(identity, f"fit|{template_name}|{engine_name}"))
+    
+    # Catch broken output here rather than after a pdflatex run has timed out on it
+    if template.source_type == LATEX:
+        with stage('lint'):
+            problem = lint_latex(document.source)
+        if problem:
+            raise ValidationError(f"Generated LaTeX failed lint: {problem}", status=422, reason='lint')
+    return document
+
+def parse_resume_request():
+    """Validate the request and render its source. Returns (Document, error response)"""
+    if not request.is_json:
+        logger.error("Request is not JSON")
+        return None, (jsonify({"error": "Request must be JSON"}), 400)
+    
+    try:
+        validate_request_size(request.content_length)
+        with stage('json_parse'):
+            data = request.get_json(silent=True)
+        if data is None:
+            return None, (jsonify({"error": "Request body is not valid JSON"}), 400)
+        return prepare_document(data, request.args.get('template'), request.args.get('engine'),
+                                request.args.get('optimize'), request.args.get('fit')), None
+    except ValidationError as e:
+        return None, rejected(e)
+
+def submit_pdf_job(document, etag=None):
+    """Queue a compile, or join an identical one already in flight. Returns (job, error response)"""
+    try:
+        job = pdf_jobs.submit(document, key=etag or pdf_etag(document))
+        if job.shared:
+            logger.info(f"Coalesced request into in-flight PDF job {job.id} ({job.submitters} submitters)")
+        return job, None
+    except QueueFull as e:
+        logger.warning(f"Rejecting PDF job: {str(e)}")
+        return None, busy_response(e.retry_after)
+
+def stopped_response(job, body):
+    """Error response for a job whose compile the sandbox stopped.
+    
+    A document over its own limits is the client's to fix (422); a timeout
+    or a kill is the server's (503, come back after Retry-After).
+    """
+    response = jsonify(body)
+    response.status_code = sandbox.status(job.reason)
+    if response.status_code == 503:
+        response.headers['Retry-After'] = str(pdf_jobs.retry_after())
+    return response
+
+def busy_response(retry_after):
+    """Fast rejection telling the client when to come back"""
+    response = jsonify({"error": "Server busy, please retry shortly", "retry_after": retry_after})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 503
+
+class ServedFile(io.FileIO):
+    """Unbuffered file handle that runs a callback once the WSGI server closes it.
+    
+    send_file responses bypass Response.call_on_close, but the server always
+    closes the file it streamed, so cleanup hangs off the file itself.
+    """
+    
+    def __init__(self, path, on_close):
+        super().__init__(path, 'rb')
+        self._on_close = on_close
+    
+    def close(self):
+        if not self.closed:
+            super().close()
+            self._on_close()
+
+class ServedBytes(io.BytesIO):
+    """ServedFile for a PDF served from the memory cache"""
+    
+    def __init__(self, pdf_content, on_close):
+        super().__init__(pdf_content)
+        self._on_close = on_close
+    
+    def close(self):
+        if not self.closed:
+            super().close()
+            self._on_close()
+
+def pdf_download_name():
+    return f"resume_{datetime.now().strftime('%Y%m%d')}.pdf"
+
+def send_pdf(compiled, strong_etag=False):
+    """Stream a compiled PDF with ETag, If-None-Match and Range support.
+    
+    For a PDF on disk the real file descriptor lets the WSGI server's
+    file_wrapper use sendfile, so it is never copied into Python memory;
+    memory-cache hits are served from their bytes.
+    
+    compiled.etag goes out weak (see pdf_etag) unless strong_etag says it is a
+    hash of the bytes. A weak ETag can't promise that ranges of two responses
+    fit together, so If-Range requests for it get the whole PDF.
+    """
+    started = time.time()
+    start = time.perf_counter()
+    # Streaming ends after the view has returned, outside the request's trace
+    parent_span = tracing.current()
+    
+    def finished():
+        record_stage('response_send', started, time.perf_counter() - start, parent_span)
+        discard_compiled(compiled)
+    
+    if compiled.content is not None:
+        pdf_file = ServedBytes(compiled.content, finished)
+        size, mtime = len(compiled.content), None
+    else:
+        pdf_file = ServedFile(compiled.path, finished)
+        stat = os.fstat(pdf_file.fileno())
+        size, mtime = stat.st_size, stat.st_mtime
+    response = send_file(
+        pdf_file,
+        as_attachment=True,
+        download_name=pdf_download_name(),
+        mimetype="application/pdf",
+        etag=False,
+        last_modified=mtime,
+        conditional=False
+    )
+    response.set_etag(compiled.etag, weak=not strong_etag)
+    response.content_length = size
+    environ = request.environ
+    if not strong_etag and 'HTTP_IF_RANGE' in environ:
+        environ = {key: value for key, value in environ.items() if key not in ('HTTP_RANGE', 'HTTP_IF_RANGE')}
+    try:
+        return response.make_conditional(environ, accept_ranges=True, complete_length=size)
+    except RequestedRangeNotSatisfiable:
+        pdf_file.close()
+        raise
+
+def publish_pdf(pdf_content):
+    """Store a finished PDF under the SHA-256 of its bytes. Returns the digest.
+    
+    The same bytes always land on the same digest, so what a /pdf/<digest>
+    URL serves never changes and may be cached forever downstream.
+    """
+    digest = hashlib.sha256(pdf_content).hexdigest()
+    # get_path also restarts the retention clock of an existing entry
+    if not published_pdfs.get_path(digest):
+        published_pdfs.put(digest, pdf_content)
+    return digest
+
+def published_url(digest, host_url):
+    return f"{(PUBLIC_BASE_URL or host_url).rstrip('/')}/pdf/{digest}"
+
+def link_response(compiled, response_mode):
+    """Publish a compiled PDF and answer with its immutable URL instead of the body"""
+    try:
+        if compiled.content is not None:
+            digest = publish_pdf(compiled.content)
+        else:
+            with open(compiled.path, 'rb') as f:
+                digest = publish_pdf(f.read())
+    finally:
+        discard_compiled(compiled)
+    url = published_url(digest, request.host_url)
+    if response_mode == 'redirect':
+        return redirect(url, code=303)
+    response = jsonify({"url": url, "sha256": digest, "retention_seconds": PDF_LINK_MAX_AGE})
+    response.status_code = 201
+    response.headers['Location'] = url
+    return response
+
+def admin_authorized():
+    """True if the request carries ADMIN_TOKEN in X-Admin-Token"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+def instrumented(view):
+    """Run a view inside a trace, and profile it when an admin sends X-Profile.
+    
+    The trace id comes from X-Trace-Id or traceparent, or is made up, and is
+    echoed in X-Trace-Id. X-Profile: cprofile or sampling (with X-Admin-Token)
+    writes a profile of this one request to PROFILE_DIR, named in X-Profile-File;
+    for POST /jobs the file appears once the queued compile has finished.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        trace_id = tracing.trace_id_from(request.headers)
+        session = None
+        profile_kind = request.headers.get('X-Profile')
+        if profile_kind:
+            if not admin_authorized():
+                return jsonify({"error": "X-Profile needs a valid X-Admin-Token"}), 403
+            if profile_kind not in profiling.KINDS:
+                return jsonify({"error": f"Unknown profile kind: {profile_kind}", "kinds": list(profiling.KINDS)}), 400
+            session = profiling.Session(profile_kind, f"{view.__name__}_{trace_id}", PROFILE_DIR)
+        with tracing.trace(trace_id), profiling.request(session), tracing.span(view.__name__, method=request.method):
+            response = app.make_response(view(*args, **kwargs))
+        response.headers[tracing.TRACE_HEADER] = trace_id
+        if session:
+            response.headers['X-Profile-File'] = os.path.basename(session.path)
+        return response
+    return wrapper
+
+def not_modified(etag):
+    """True if the client already holds this document (If-None-Match, weak comparison)"""
+    return request.if_none_match.contains_weak(etag)
 
 @app.route("/generate-pdf", methods=["POST"])
+@instrumented
 def generate_resume():
     """Main PDF generation endpoint with detailed logging"""
     start_time = datetime.now()
     logger.info("PDF generation request started")
     
     try:
-        # Validate input
-        if not request.is_json:
-            logger.error("Request is not JSON")
-            return jsonify({"error": "Request must be JSON"}), 400
-            
-        data = request.get_json()
-        logger.info(f"Request data keys: {list(data.keys())}")
+        response_mode = request.args.get('response', 'pdf')
+        if response_mode not in RESPONSE_MODES:
+            return jsonify({"error": f"Unknown response mode: {response_mode}", "modes": list(RESPONSE_MODES)}), 400
         
-        # [Rest of your existing resume generation code...]
-        # (Keep all your existing LaTeX template generation code here)
-         # Basic Info
-        name = escape_latex(data.get("name", "Your Name"))
-        phone = escape_latex(data.get("phone", "123-456-7890"))
-        email = escape_latex(data.get("email", "example@email.com"))
-        linkedin = escape_latex(data.get("linkedin", ""))
-        github = escape_latex(data.get("github", ""))
-
-        # Education
-        education_latex = ""
-        for edu in data.get("education", []):
-            institution = escape_latex(edu.get("institution", ""))
-            location = escape_latex(edu.get("location", ""))
-            degree = escape_latex(edu.get("degree", ""))
-            dates = escape_latex(edu.get("dates", ""))
-            education_latex += f"""
-    \\resumeSubheading
-      {{{institution}}}{{{location}}}
-      {{{degree}}}{{{dates}}}"""
-
-        # Experience
-        experience_latex = ""
-        for exp in data.get("experience", []):
-            position = escape_latex(exp.get("position", ""))
-            dates = escape_latex(exp.get("dates", ""))
-            company = escape_latex(exp.get("company", ""))
-            location = escape_latex(exp.get("location", ""))
-
-            experience_latex += f"""
-    \\resumeSubheading
-      {{{position}}}{{{dates}}}
-      {{{company}}}{{{location}}}
-      \\resumeItemListStart"""
-
-            for bullet in exp.get("bullets", []):
-                bullet_text = escape_latex(bullet)
-                experience_latex += f"""
-        \\resumeItem{{{bullet_text}}}"""
-
-            experience_latex += """
-      \\resumeItemListEnd"""
-
-        # Projects
-        projects_latex = ""
-        for proj in data.get("projects", []):
-            proj_name = escape_latex(proj.get("name", ""))
-            technologies = escape_latex(proj.get("technologies", ""))
-            dates = escape_latex(proj.get("dates", ""))
-
-            projects_latex += f"""
-    \\resumeProjectHeading
-      {{\\textbf{{{proj_name}}} $|$ \\emph{{{technologies}}}}}{{{dates}}}
-      \\resumeItemListStart"""
-
-            for bullet in proj.get("bullets", []):
-                bullet_text = escape_latex(bullet)
-                projects_latex += f"""
-        \\resumeItem{{{bullet_text}}}"""
-
-            projects_latex += """
-      \\resumeItemListEnd"""
-
-        # Skills
-        skills_latex = ""
-        for category, items in data.get("skills", {}).items():
-            category_text = escape_latex(category)
-            skills_list = [escape_latex(skill) for skill in items]
-            skills_text = ", ".join(skills_list)
-            skills_latex += f"     \\textbf{{{category_text}}}: {skills_text} \\\\\n"
-
-        # Final LaTeX document
-        latex_content = r"""
-\documentclass[letterpaper,11pt]{article}
-\usepackage{latexsym}
-\usepackage[empty]{fullpage}
-\usepackage{titlesec}
-\usepackage{marvosym}
-\usepackage[usenames,dvipsnames]{color}
-\usepackage{verbatim}
-\usepackage{enumitem}
-\usepackage[hidelinks]{hyperref}
-\usepackage{fancyhdr}
-\usepackage[english]{babel}
-\usepackage{tabularx}
-
-\pagestyle{fancy}
-\fancyhf{}
-\fancyfoot{}
-\renewcommand{\headrulewidth}{0pt}
-\renewcommand{\footrulewidth}{0pt}
-\addtolength{\oddsidemargin}{-0.5in}
-\addtolength{\evensidemargin}{-0.5in}
-\addtolength{\textwidth}{1in}
-\addtolength{\topmargin}{-.5in}
-\addtolength{\textheight}{1.0in}
-\urlstyle{same}
-\raggedbottom
-\raggedright
-\setlength{\tabcolsep}{0in}
-
-\titleformat{\section}{\vspace{-4pt}\scshape\raggedright\large}{}{0em}{}[\color{black}\titlerule \vspace{-5pt}]
-\newcommand{\resumeItem}[1]{\item\small{{#1 \vspace{-2pt}}}}
-\newcommand{\resumeSubheading}[4]{
-  \vspace{-2pt}\item
-    \begin{tabular*}{0.97\textwidth}[t]{l@{\extracolsep{\fill}}r}
-      \textbf{#1} & #2 \\
-      \textit{\small#3} & \textit{\small #4} \\
-    \end{tabular*}\vspace{-7pt}
-}
-\newcommand{\resumeProjectHeading}[2]{
-    \item
-    \begin{tabular*}{0.97\textwidth}{l@{\extracolsep{\fill}}r}
-      \small#1 & #2 \\
-    \end{tabular*}\vspace{-7pt}
-}
-\renewcommand\labelitemii{$\vcenter{\hbox{\tiny$\bullet$}}$}
-\newcommand{\resumeSubHeadingListStart}{\begin{itemize}[leftmargin=0.15in, label={}]} 
-\newcommand{\resumeSubHeadingListEnd}{\end{itemize}}
-\newcommand{\resumeItemListStart}{\begin{itemize}} 
-\newcommand{\resumeItemListEnd}{\end{itemize}\vspace{-5pt}}
-
-\begin{document}
-\begin{center}
-    \textbf{\Huge \scshape """ + name + r"""} \\ \vspace{1pt}
-    \small """ + phone + " $|$ \\href{mailto:" + email + "}{\\underline{" + email + "}} $|$ " + \
-    "\\href{https://linkedin.com/in/" + linkedin + "}{\\underline{linkedin.com/in/" + linkedin + "}} $|$ " + \
-    "\\href{https://github.com/" + github + "}{\\underline{github.com/" + github + "}}" + r"""
-\end{center}
-
-\section{Education}
-\resumeSubHeadingListStart""" + education_latex + r"""
-\resumeSubHeadingListEnd
-
-\section{Experience}
-\resumeSubHeadingListStart""" + experience_latex + r"""
-\resumeSubHeadingListEnd
-
-\section{Projects}
-\resumeSubHeadingListStart""" + projects_latex + r"""
-\resumeSubHeadingListEnd
-
-\section{Technical Skills}
-\begin{itemize}[leftmargin=0.15in, label={}]
-    \small{\item{
-""" + skills_latex + r"""
-    }}
-\end{itemize}
-\end{document}
-"""
+        document, error = parse_resume_request()
+        if error:
+            return error
+        
+        # The ETag is known before compiling, so a client re-posting an unchanged
+        # form with If-None-Match gets a 304 without any work
+        etag = pdf_etag(document)
+        if response_mode == 'pdf' and not_modified(etag):
+            logger.info(f"PDF not modified: {etag[:12]}")
+            response = app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            return response
         
-        # Generate PDF
-        logger.info("Starting PDF generation")
-        pdf_content = generate_pdf(latex_content)
+        # Serve byte-identical documents from the cache without queueing
+        compiled = lookup_cached_pdf(etag)
         
-        if not pdf_content:
-            logger.error("PDF generation failed")
-            return jsonify({"error": "PDF generation failed"}), 500
+        if not compiled:
+            job, error = submit_pdf_job(document, etag)
+            if error:
+                return error
+            if not job.wait(PDF_JOB_WAIT_TIMEOUT):
+                logger.error(f"PDF job {job.id} still {job.status} after {PDF_JOB_WAIT_TIMEOUT}s")
+                return jsonify({"error": "PDF generation timed out", "job_id": job.id}), 504
+            if job.shed:
+                return busy_response(pdf_jobs.retry_after())
+            compiled = job.result
+            
+            if not compiled:
+                logger.error("PDF generation failed")
+                if job.reason:
+                    return stopped_response(job, {"error": job.error, "reason": job.reason})
+                return jsonify({"error": "PDF generation failed"}), 500
+            if job.shared:
+                # Other requests are sending the same file; it goes when the job expires
+                compiled = compiled._replace(ephemeral=False)
         
         # Prepare response
         duration = (datetime.now() - start_time).total_seconds()
         logger.info(f"Request completed in {duration:.2f} seconds")
         
-        return send_file(
-            BytesIO(pdf_content),
-            as_attachment=True,
-            download_name=f"resume_{datetime.now().strftime('%Y%m%d')}.pdf",
-            mimetype="application/pdf"
-        )
+        if response_mode != 'pdf':
+            return link_response(compiled, response_mode)
+        return send_pdf(compiled)
         
     except Exception as e:
         logger.error(f"Error in generate_resume: {str(e)}")
@@ -397,10 +1056,269 @@ def generate_resume():
             "traceback": traceback.format_exc()
         }), 500
 
+@app.route("/pdf/<digest>")
+@instrumented
+def published_pdf(digest):
+    """Immutable download of a published PDF, cacheable by any CDN or browser"""
+    path = published_pdfs.get_path(digest) if PUBLISHED_DIGEST.fullmatch(digest) else None
+    if not path:
+        response = jsonify({"error": "Unknown or expired PDF"})
+        response.status_code = 404
+        # It may be published later, so don't let an edge pin the 404
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    response = send_pdf(CompiledPdf(path, digest, False), strong_etag=True)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+@app.route("/jobs", methods=["POST"])
+@instrumented
+def submit_resume_job():
+    """Queue a PDF build and return immediately with a job id to poll"""
+    try:
+        document, error = parse_resume_request()
+        if error:
+            return error
+        
+        job, error = submit_pdf_job(document)
+        if error:
+            return error
+        
+        logger.info(f"Queued PDF job {job.id}")
+        # An X-Profile capture of this request also covers the compile it queued
+        profiling.follow(job.wait, PROFILE_MAX_SECONDS)
+        response = jsonify({
+            **job.to_dict(),
+            "status_url": url_for('resume_job_status', job_id=job.id),
+            "result_url": url_for('resume_job_result', job_id=job.id)
+        })
+        response.headers['Location'] = url_for('resume_job_status', job_id=job.id)
+        return response, 202
+        
+    except Exception as e:
+        logger.error(f"Error in submit_resume_job: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+@app.route("/jobs/<job_id>")
+@instrumented
+def resume_job_status(job_id):
+    """Report whether a job is queued, running, done or failed"""
+    job = pdf_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if result_gone(job):
+        return result_gone_response(job)
+    return jsonify(job.to_dict())
+
+def result_gone(job):
+    """True if a finished job's PDF has been evicted (cache sweep) before the job expired"""
+    return job.status == DONE and not os.path.exists(job.result.path)
+
+def result_gone_response(job):
+    return jsonify({**job.to_dict(), "status": "expired", "error": "Job result expired"}), 410
+
+@app.route("/jobs/<job_id>/result")
+@instrumented
+def resume_job_result(job_id):
+    """Download the PDF of a finished job"""
+    job = pdf_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if job.shed:
+        return busy_response(pdf_jobs.retry_after())
+    if job.status == FAILED:
+        if job.reason:
+            return stopped_response(job, job.to_dict())
+        return jsonify(job.to_dict()), 500
+    if job.status != DONE:
+        return jsonify(job.to_dict()), 202
+    if result_gone(job):
+        return result_gone_response(job)
+    # The job keeps its file until it expires, so it can be fetched again
+    try:
+        return send_pdf(job.result._replace(ephemeral=False))
+    except FileNotFoundError:
+        # Evicted between the check and the open
+        return result_gone_response(job)
+
+PreviewRequest = namedtuple('PreviewRequest', ['document', 'key', 'dpi', 'image_format', 'client', 'seq'])
+
+def preview_pdf(document):
+    """The compiled PDF behind a preview, from the cache or a pdf_jobs compile.
+    
+    Compiling on pdf_jobs keeps previews under MAX_CONCURRENT_COMPILES and
+    lets a preview and a download of the same document share one compile.
+    A full pdf_jobs raises QueueFull, which sheds the preview job too.
+    """
+    etag = pdf_etag(document)
+    compiled = cached_pdf_file(etag)
+    if compiled:
+        return compiled
+    job = pdf_jobs.submit(document, key=etag)
+    if not job.wait(PREVIEW_WAIT_TIMEOUT) or not job.result:
+        if job.reason:
+            raise sandbox.LimitExceeded(job.reason, job.error)
+        return None
+    if job.shared:
+        # Whoever else waits on the job may still be sending the file; it goes when the job expires
+        return job.result._replace(ephemeral=False)
+    return job.result
+
+def render_preview(preview):
+    """Preview job handler: compile through pdf_jobs and rasterize page 1"""
+    # Checked again here because newer keystrokes may have arrived while queued
+    if not preview_sequencer.is_current(preview.client, preview.seq):
+        return None
+    compiled = preview_pdf(preview.document)
+    if not compiled:
+        return None
+    try:
+        with stage('rasterize'):
+            png_content = rasterize_first_page(compiled.path, preview.dpi, SCRATCH_DIR)
+    finally:
+        discard_compiled(compiled)
+    image = convert_image(png_content, preview.image_format) if png_content else None
+    if image:
+        preview_cache.put(preview.key, image)
+    return image
+
+preview_jobs = JobQueue(
+    job_handler(render_preview),
+    workers=int(os.environ.get('PREVIEW_MAX_CONCURRENT', max(1, MAX_CONCURRENT_COMPILES // 4))),
+    max_queued=int(os.environ.get('PREVIEW_QUEUE_SIZE', 4)),
+    result_ttl=30,
+    max_wait=float(os.environ.get('PREVIEW_MAX_QUEUE_WAIT', 5)),
+    name='Preview'
+)
+
+def superseded_response():
+    PREVIEWS.inc(outcome='superseded')
+    return jsonify({"error": "Superseded by a newer preview request"}), 409
+
+@app.route("/preview", methods=["POST"])
+@instrumented
+def preview_resume():
+    """Page 1 of the resume as an image, for live preview while editing.
+    
+    Query: dpi, format (png or webp). Clients may send X-Preview-Client and an
+    increasing X-Preview-Seq so requests overtaken by newer ones are dropped.
+    """
+    try:
+        dpi = request.args.get('dpi', PREVIEW_DPI, type=int)
+        if dpi is None or not PREVIEW_MIN_DPI <= dpi <= PREVIEW_MAX_DPI:
+            return jsonify({"error": f"dpi must be between {PREVIEW_MIN_DPI} and {PREVIEW_MAX_DPI}"}), 400
+        image_format = request.args.get('format', 'png').lower()
+        if image_format not in available_formats():
+            return jsonify({"error": f"Unsupported preview format: {image_format}", "formats": available_formats()}), 400
+        
+        client = request.headers.get('X-Preview-Client')
+        seq = request.headers.get('X-Preview-Seq', type=int)
+        if not preview_sequencer.advance(client, seq):
+            return superseded_response()
+        
+        document, error = parse_resume_request()
+        if error:
+            return error
+        
+        etag = cache_key(pdf_etag(document), f"preview|{dpi}|{image_format}")
+        if not_modified(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        image = preview_cache.get(etag)
+        if image is not None:
+            PREVIEWS.inc(outcome='cached')
+        else:
+            try:
+                job = preview_jobs.submit(PreviewRequest(document, etag, dpi, image_format, client, seq))
+            except QueueFull as e:
+                logger.warning(f"Rejecting preview job: {str(e)}")
+                return busy_response(e.retry_after)
+            if not job.wait(PREVIEW_WAIT_TIMEOUT):
+                return jsonify({"error": "Preview timed out"}), 504
+            if not preview_sequencer.is_current(client, seq):
+                return superseded_response()
+            if job.shed:
+                return busy_response(preview_jobs.retry_after())
+            image = job.result
+            if not image:
+                PREVIEWS.inc(outcome='failed')
+                if job.reason:
+                    return stopped_response(job, {"error": job.error, "reason": job.reason})
+                return jsonify({"error": "Preview generation failed"}), 500
+            PREVIEWS.inc(outcome='rendered')
+        
+        response = app.response_class(image, mimetype=PREVIEW_MIMETYPES[image_format])
+        response.set_etag(etag)
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error in preview_resume: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+@app.after_request
+def count_request(response):
+    HTTP_REQUESTS.inc(endpoint=request.endpoint or 'unknown', status=response.status_code)
+    return response
+
+@app.route("/admin/profile", methods=["GET", "POST"])
+def profile_window():
+    """Profile the whole process for a while (POST), or list captured profiles (GET).
+    
+    POST {"kind": "sampling" or "cprofile", "seconds": 30, "interval_ms": 5}.
+    Sampling covers every thread; cProfile covers every request and job that
+    starts during the window. Needs X-Admin-Token.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    if request.method == "GET":
+        return jsonify({"window": profiling.window.state(), "profiles": profiling.list_profiles(PROFILE_DIR)})
+    
+    options = request.get_json(silent=True) or {}
+    kind = options.get('kind', profiling.SAMPLING)
+    seconds = options.get('seconds', 30)
+    interval_ms = options.get('interval_ms', 5)
+    if kind not in profiling.KINDS:
+        return jsonify({"error": f"Unknown profile kind: {kind}", "kinds": list(profiling.KINDS)}), 400
+    if not isinstance(seconds, (int, float)) or not 0 < seconds <= PROFILE_MAX_SECONDS:
+        return jsonify({"error": f"seconds must be between 0 and {PROFILE_MAX_SECONDS}"}), 400
+    if not isinstance(interval_ms, (int, float)) or not 1 <= interval_ms <= 1000:
+        return jsonify({"error": "interval_ms must be between 1 and 1000"}), 400
+    
+    session = profiling.Session(kind, 'window', PROFILE_DIR, interval=interval_ms / 1000, all_threads=True)
+    if not profiling.window.start(session, seconds):
+        return jsonify({"error": "A profile is already being captured", "window": profiling.window.state()}), 409
+    logger.info(f"Capturing a {kind} profile for {seconds}s into {session.path}")
+    return jsonify(session.state()), 202
+
+@app.route("/admin/profile/<name>")
+def download_profile(name):
+    """Download a captured profile. Needs X-Admin-Token."""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    return send_from_directory(PROFILE_DIR, name, as_attachment=True)
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint"""
+    return REGISTRY.render(), 200, {'Content-Type': METRICS_CONTENT_TYPE}
+
 # Initialize environment when starting
 setup_environment()
 
 if __name__ == "__main__":
+    if '--build-format' in sys.argv:
+        # Deploy-time prebuild; setup_environment() above has started it
+        warmup.wait()
+        sys.exit(0 if all(template.format.path() for template in resume_templates if template.format) else 1)
+    
     port = int(os.environ.get("PORT", 8080))
     logger.info(f"Starting Rizzume API on port {port}")
     logger.info(f"Temp PDF directory: {TEMP_PDF_DIR}")
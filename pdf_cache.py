@@ -0,0 +1,216 @@
+import os
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger('rizzume')
+
+
+def cache_key(latex_content, version):
+    """Content address for a compiled document"""
+    digest = hashlib.sha256()
+    digest.update(version.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(latex_content.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class PdfCache:
+    """Two-tier cache of compiled PDFs keyed by content hash.
+
+    The memory tier is a per-process LRU bounded by total bytes. The disk tier is
+    a directory shared by every worker process, bounded by total size and entry
+    age. Disk writes go through a temp file and os.replace so readers in other
+    processes never see partial PDFs.
+
+    get/put work with bytes and use both tiers. get_path/put_file work with
+    files, so responses can be streamed with sendfile without holding the PDF
+    in memory; put_file still fills the memory tier, which get_memory checks
+    first so hot documents are served without touching the disk.
+
+    Entries are opaque bytes, so other rendered artifacts (such as preview
+    images) can use their own instance with a different suffix.
+    """
+
+    def __init__(self, cache_dir, memory_bytes, disk_bytes, max_age, sweep_interval=60, suffix='.pdf'):
+        self.cache_dir = cache_dir
+        self.suffix = suffix
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._last_sweep = 0
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}{self.suffix}")
+
+    def get(self, key):
+        """Return cached PDF bytes or None"""
+        with self._lock:
+            pdf_content = self._memory.get(key)
+            if pdf_content is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return pdf_content
+
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                raise FileNotFoundError(path)
+            with open(path, 'rb') as f:
+                pdf_content = f.read()
+            # Refresh mtime so the disk sweep evicts least recently used entries first
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._remember(key, pdf_content)
+        return pdf_content
+
+    def get_memory(self, key):
+        """Return PDF bytes from the memory tier only, or None. A miss is not counted."""
+        with self._lock:
+            pdf_content = self._memory.get(key)
+            if pdf_content is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+            return pdf_content
+
+    def get_path(self, key):
+        """Return the disk-tier path of a fresh cached PDF for streaming, or None"""
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                raise FileNotFoundError(path)
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        with self._lock:
+            self._stats["disk_hits"] += 1
+        return path
+
+    def put_file(self, key, src_path):
+        """Move a finished PDF into the disk tier, and into memory if it fits. Returns its cached path."""
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(src_path, path)
+        except OSError:
+            # Different filesystem: copy next to the target, then rename atomically
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            os.close(fd)
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, path)
+            os.remove(src_path)
+        pdf_content = None
+        if self.memory_bytes and os.path.getsize(path) <= self.memory_bytes:
+            with open(path, 'rb') as f:
+                pdf_content = f.read()
+        with self._lock:
+            self._stats["stores"] += 1
+            if pdf_content is not None:
+                self._remember(key, pdf_content)
+
+        if time.time() - self._last_sweep > self.sweep_interval:
+            self.sweep()
+        return path
+
+    def put(self, key, pdf_content):
+        """Store PDF bytes in both tiers"""
+        with self._lock:
+            self._remember(key, pdf_content)
+            self._stats["stores"] += 1
+
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pdf_content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error writing PDF cache entry {key[:12]}: {str(e)}")
+            return
+
+        if time.time() - self._last_sweep > self.sweep_interval:
+            self.sweep()
+
+    def _remember(self, key, pdf_content):
+        # Caller holds self._lock
+        if len(pdf_content) > self.memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= len(previous)
+        self._memory[key] = pdf_content
+        self._memory_size += len(pdf_content)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def sweep(self):
+        """Apply age and size limits to the shared disk tier"""
+        self._last_sweep = time.time()
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        # Oldest first: expired entries go, then LRU entries until under budget
+        for mtime, size, path in sorted(entries):
+            if path.endswith('.tmp'):
+                # In-progress writes from other workers; only drop leftovers from crashes
+                if now - mtime <= self.sweep_interval:
+                    continue
+            elif now - mtime <= self.max_age and total <= self.disk_bytes:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+
+        if removed:
+            with self._lock:
+                self._stats["evictions"] += removed
+            logger.info(f"PDF cache sweep removed {removed} entries, {total} bytes remain")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_size
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,245 @@
+import math
+import time
+import uuid
+import queue
+import logging
+import threading
+import contextvars
+from collections import deque
+import tracing
+
+logger = logging.getLogger('rizzume')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFull(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, payload, key=None):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.key = key
+        self.submitters = 1
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.reason = None
+        self.shed = False
+        self.created = time.time()
+        # The submitter's context (trace, profiling), which the handler runs in
+        self.context = contextvars.copy_context()
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+
+    @property
+    def shared(self):
+        """True if identical submissions were coalesced into this job"""
+        return self.submitters > 1
+
+    def wait(self, timeout=None):
+        """Block until the job is done or failed. Returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created": self.created,
+        }
+        if self.started:
+            data["queue_seconds"] = round(self.started - self.created, 3)
+        if self.finished:
+            data["run_seconds"] = round(self.finished - self.started, 3)
+        if self.error:
+            data["error"] = self.error
+        if self.reason:
+            data["reason"] = self.reason
+        return data
+
+
+class JobQueue:
+    """Bounded in-process queue of PDF compile jobs served by worker threads.
+
+    `handler(payload)` returns the job result or None on failure; the payload
+    is whatever the handler understands (a main.Document for compiles, a
+    main.PreviewRequest for previews). It runs in
+    the contextvars context of whoever submitted the job, so the request's
+    trace and profiling session follow it onto the worker. Finished
+    jobs keep their result for `result_ttl` seconds and are then forgotten,
+    after passing it to `on_expire` so backing files can be removed.
+
+    The worker count caps concurrent compiles. Submissions beyond `max_queued`
+    are refused with QueueFull, and jobs that waited longer than `max_wait`
+    seconds are shed without compiling, since their client has likely given up.
+    A handler raising QueueFull from a queue it feeds sheds its job as well.
+
+    Submissions with a `key` are coalesced: while a job with the same key is
+    queued or running, submitting again returns that job instead of a new one,
+    so every submitter waits on one run and sees its result or its error.
+    """
+
+    def __init__(self, handler, workers, max_queued, result_ttl, max_wait=None, on_expire=None, name='PDF'):
+        self.handler = handler
+        self.name = name
+        self.on_expire = on_expire
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.max_wait = max_wait
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = 0
+        self._waits = deque(maxlen=500)
+        self._runs = deque(maxlen=500)
+        self._stats = {"submitted": 0, "rejected": 0, "shed": 0, "completed": 0, "failed": 0, "coalesced": 0}
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'{self.name.lower()}-job-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} {self.name} job workers")
+
+    def submit(self, payload, key=None):
+        self._expire()
+        with self._lock:
+            job = self._inflight.get(key) if key is not None else None
+            if job is not None:
+                job.submitters += 1
+                self._stats["coalesced"] += 1
+                return job
+            job = Job(payload, key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._inflight[key] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._stats["rejected"] += 1
+                # Anyone who joined in the meantime is shed rather than left waiting
+                job.status = FAILED
+                job.shed = True
+                job.error = "Server busy, please retry shortly"
+                job.finished = time.time()
+                if not job.shared:
+                    del self._jobs[job.id]
+            job._done.set()
+            raise QueueFull(f"{self._queue.maxsize} jobs already queued", self.retry_after())
+        with self._lock:
+            self._stats["submitted"] += 1
+        return job
+
+    def get(self, job_id):
+        self._expire()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def retry_after(self):
+        """Seconds until the current backlog should have drained"""
+        with self._lock:
+            average_run = sum(self._runs) / len(self._runs) if self._runs else 1.0
+            running = self._running
+        backlog = self.depth() + running
+        return max(1, math.ceil(average_run * backlog / max(self.workers, 1)))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            waits = sorted(self._waits)
+            stats["running"] = self._running
+            stats["tracked_jobs"] = len(self._jobs)
+            stats["inflight_keys"] = len(self._inflight)
+        stats["depth"] = self.depth()
+        stats["max_queued"] = self.max_queued
+        stats["workers"] = self.workers
+        if waits:
+            stats["wait_seconds_avg"] = round(sum(waits) / len(waits), 3)
+            stats["wait_seconds_p95"] = round(waits[int(0.95 * (len(waits) - 1))], 3)
+            stats["wait_seconds_max"] = round(waits[-1], 3)
+        return stats
+
+    def _expire(self):
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.finished and job.finished < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+        if self.on_expire:
+            for job in expired:
+                if job.result is not None:
+                    self.on_expire(job.result)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.started = time.time()
+            waited = job.started - job.created
+            with self._lock:
+                self._waits.append(waited)
+                self._running += 1
+            try:
+                if self.max_wait and waited > self.max_wait:
+                    logger.warning(f"Shedding {self.name} job {job.id} after {waited:.1f}s in queue")
+                    job.status = FAILED
+                    job.shed = True
+                    job.error = "Server busy, please retry shortly"
+                    continue
+                job.status = RUNNING
+                job.context.run(tracing.record, 'queue_wait', job.created, waited)
+                job.result = job.context.run(self.handler, job.payload)
+                if job.result:
+                    job.status = DONE
+                else:
+                    job.status = FAILED
+                    job.error = f"{self.name} generation failed"
+            except QueueFull:
+                # The handler hands work to another queue that is full
+                logger.warning(f"Shedding {self.name} job {job.id}: downstream queue is full")
+                job.status = FAILED
+                job.shed = True
+                job.error = "Server busy, please retry shortly"
+            except Exception as e:
+                logger.error(f"Error in {self.name} job {job.id}: {str(e)}")
+                job.status = FAILED
+                job.error = str(e)
+                # Failure category of handler errors that carry one, e.g. sandbox.LimitExceeded
+                job.reason = getattr(e, 'reason', None)
+            finally:
+                # The payload (source included) is no longer needed once the job has run
+                job.payload = None
+                job.context = None
+                job.finished = time.time()
+                with self._lock:
+                    # Later identical submissions start a fresh job from here on
+                    if job.key is not None and self._inflight.get(job.key) is job:
+                        del self._inflight[job.key]
+                    self._running -= 1
+                    if job.shed:
+                        self._stats["shed"] += 1
+                    else:
+                        self._runs.append(job.finished - job.started)
+                        self._stats["completed" if job.status == DONE else "failed"] += 1
+                job._done.set()
+                self._queue.task_done()
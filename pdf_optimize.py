@@ -0,0 +1,104 @@
+import os
+import shutil
+import logging
+import subprocess
+
+logger = logging.getLogger('rizzume')
+
+GHOSTSCRIPT = os.environ.get('GHOSTSCRIPT', 'gs')
+OFF = 'off'
+
+# Ghostscript pdfwrite settings per preset, from quickest to smallest. Every
+# preset re-embeds fonts as compressed subsets, which is most of the win on
+# a text-only resume (texlive-fonts-extra and marvosym embed whole fonts).
+PRESETS = {
+    OFF: None,
+    # Font subsetting and stream compression only; images untouched
+    'fast': [
+        '-dPDFSETTINGS=/prepress',
+        '-dSubsetFonts=true', '-dCompressFonts=true', '-dCompressPages=true',
+    ],
+    # Also pack objects into compressed object streams and linearise for
+    # fast web view, so browsers can show page 1 before the download ends
+    'balanced': [
+        '-dPDFSETTINGS=/printer',
+        '-dSubsetFonts=true', '-dCompressFonts=true', '-dCompressPages=true',
+        '-dDetectDuplicateImages=true',
+        '-dWriteObjStms=true', '-dWriteXRefStm=true',
+        '-dFastWebView=true',
+    ],
+    # Additionally downsamples images to 150 dpi; slowest, smallest
+    'smallest': [
+        '-dPDFSETTINGS=/ebook',
+        '-dSubsetFonts=true', '-dCompressFonts=true', '-dCompressPages=true',
+        '-dDetectDuplicateImages=true',
+        '-dWriteObjStms=true', '-dWriteXRefStm=true',
+        '-dFastWebView=true',
+    ],
+}
+
+
+def available():
+    return shutil.which(GHOSTSCRIPT) is not None
+
+
+def command(preset, input_path, output_path):
+    """Ghostscript argv rewriting input_path to output_path with a preset"""
+    return [
+        GHOSTSCRIPT,
+        '-q', '-dNOPAUSE', '-dBATCH', '-dSAFER',
+        '-sDEVICE=pdfwrite',
+        '-dCompatibilityLevel=1.5',
+        *PRESETS[preset],
+        f"-sOutputFile={output_path}",
+        input_path,
+    ]
+
+
+def optimized_path(path):
+    return f"{path}.opt"
+
+
+def adopt(path, candidate):
+    """Replace path with the optimised candidate if it is smaller.
+
+    Returns (bytes before, bytes after). The candidate is removed either way,
+    so a Ghostscript run that grew the file costs nothing but time.
+    """
+    before = os.path.getsize(path)
+    try:
+        after = os.path.getsize(candidate)
+    except FileNotFoundError:
+        return before, before
+    if 0 < after < before:
+        os.replace(candidate, path)
+        return before, after
+    os.remove(candidate)
+    return before, before
+
+
+def optimize_pdf(path, preset, timeout=30):
+    """Rewrite the PDF at path in place with a preset.
+
+    Returns (bytes before, bytes after), or None if Ghostscript is missing or
+    failed, in which case the original file is left as it was.
+    """
+    candidate = optimized_path(path)
+    try:
+        result = subprocess.run(command(preset, path, candidate), capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.error(f"Ghostscript failed to run: {str(e)}")
+        _remove(candidate)
+        return None
+    if result.returncode != 0:
+        logger.error(f"Ghostscript failed with code {result.returncode}: {result.stderr.strip()[:200]}")
+        _remove(candidate)
+        return None
+    return adopt(path, candidate)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,167 @@
+import os
+import time
+import uuid
+import shutil
+import logging
+import threading
+import subprocess
+from collections import deque
+import sandbox
+
+logger = logging.getLogger('rizzume')
+
+JOBNAME = 'resume'
+
+# Executed as pdflatex's first line once the format is loaded: block on a terminal
+# read until a job arrives, then typeset the body written into the workspace.
+# \read16 needs errorstopmode, so nonstopmode is only switched on afterwards.
+PARK_LINE = r'\endlinechar=-1 \read16 to \rizzumego \endlinechar=13 \nonstopmode\input{' + JOBNAME + '.tex}'
+
+
+class WarmWorker:
+    """A pdflatex process started ahead of time and parked after loading the format"""
+
+    def __init__(self, workspace, format_name, format_args, env, limits=sandbox.DEFAULT_LIMITS):
+        self.workspace = workspace
+        self.jobname = JOBNAME
+        self.format_name = format_name
+        self.started = time.monotonic()
+        self.limits = limits
+        # Limits apply from startup, but a parked process uses no CPU time
+        self.process = sandbox.spawn(
+            ['pdflatex', *format_args, '-halt-on-error', '-file-line-error',
+             f"-jobname={JOBNAME}", PARK_LINE],
+            limits,
+            cwd=workspace,
+            env=env,
+            stdin=subprocess.PIPE
+        )
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, timeout):
+        """Release the parked process on <workspace>/<jobname>.tex and wait for it.
+
+        Raises sandbox.LimitExceeded like sandbox.run.
+        """
+        return sandbox.wait(self.process, timeout, input='go\n', limits=self.limits)
+
+    def discard(self):
+        if self.alive():
+            sandbox.kill_group(self.process.pid)
+        try:
+            self.process.communicate(timeout=5)
+        except Exception:
+            pass
+        shutil.rmtree(self.workspace, ignore_errors=True)
+
+
+class WarmPool:
+    """Keeps `size` pdflatex workers parked with the preamble format loaded.
+
+    pdfTeX writes exactly one PDF per process, so each worker serves one job and
+    is then replaced by the background refill thread. Parked workers are health
+    checked on every pass and recycled when they die, exceed `max_idle` seconds
+    or were started against an outdated format.
+    """
+
+    def __init__(self, preamble_format, pool_dir, size, max_idle=600):
+        self.preamble_format = preamble_format
+        self.pool_dir = pool_dir
+        self.size = size
+        self.max_idle = max_idle
+        self._parked = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stats = {"spawned": 0, "served": 0, "recycled": 0, "misses": 0}
+
+    def start(self):
+        if self.size <= 0 or self._thread is not None:
+            return
+        # Workspaces left behind by a previous process are never reused
+        shutil.rmtree(self.pool_dir, ignore_errors=True)
+        os.makedirs(self.pool_dir, exist_ok=True)
+        self._wakeup.set()
+        self._thread = threading.Thread(target=self._refill_loop, name='pdflatex-pool', daemon=True)
+        self._thread.start()
+        logger.info(f"Started warm pdflatex pool with {self.size} workers in {self.pool_dir}")
+
+    def acquire(self):
+        """Pop a healthy parked worker, or None if none is ready"""
+        while True:
+            with self._lock:
+                worker = self._parked.popleft() if self._parked else None
+            self._wakeup.set()
+            if worker is None:
+                with self._lock:
+                    self._stats["misses"] += 1
+                return None
+            if self._usable(worker):
+                with self._lock:
+                    self._stats["served"] += 1
+                return worker
+            self._recycle(worker)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["parked"] = len(self._parked)
+        stats["size"] = self.size
+        return stats
+
+    def _recycle(self, worker):
+        worker.discard()
+        with self._lock:
+            self._stats["recycled"] += 1
+
+    def _spawn(self):
+        fmt_path = self.preamble_format.path()
+        if not fmt_path:
+            return None
+        workspace = os.path.join(self.pool_dir, f"w{uuid.uuid4().hex}")
+        os.makedirs(workspace)
+        format_args, env = self.preamble_format.compile_args()
+        try:
+            worker = WarmWorker(workspace, os.path.basename(fmt_path)[:-len('.fmt')], format_args, env)
+        except Exception as e:
+            logger.error(f"Error starting warm pdflatex worker: {str(e)}")
+            shutil.rmtree(workspace, ignore_errors=True)
+            return None
+        with self._lock:
+            self._stats["spawned"] += 1
+        return worker
+
+    def _refill_loop(self):
+        while True:
+            self._wakeup.wait(timeout=5)
+            self._wakeup.clear()
+            try:
+                self._check_parked()
+                while True:
+                    with self._lock:
+                        missing = self.size - len(self._parked)
+                    if missing <= 0:
+                        break
+                    worker = self._spawn()
+                    if worker is None:
+                        break
+                    with self._lock:
+                        self._parked.append(worker)
+            except Exception as e:
+                logger.error(f"Error in warm pdflatex pool: {str(e)}")
+
+    def _check_parked(self):
+        now = time.monotonic()
+        with self._lock:
+            healthy = [w for w in self._parked if self._usable(w) and now - w.started < self.max_idle]
+            stale = [w for w in self._parked if w not in healthy]
+            self._parked = deque(healthy)
+        for worker in stale:
+            self._recycle(worker)
+
+    def _usable(self, worker):
+        current = self.preamble_format.path()
+        return worker.alive() and current is not None \
+            and os.path.basename(current) == f"{worker.format_name}.fmt"
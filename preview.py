@@ -0,0 +1,96 @@
+import io
+import os
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+
+try:
+    from PIL import Image
+except ImportError:  # WebP previews need Pillow; PNG only needs poppler
+    Image = None
+
+logger = logging.getLogger('rizzume')
+
+MIMETYPES = {'png': 'image/png', 'webp': 'image/webp'}
+
+
+def available_formats():
+    return ['png', 'webp'] if Image is not None else ['png']
+
+
+def rasterize_first_page(pdf_path, dpi, work_dir, timeout=15):
+    """Render page 1 of a PDF to PNG bytes with poppler's pdftoppm. Returns None on failure."""
+    out_dir = tempfile.mkdtemp(dir=work_dir)
+    try:
+        prefix = os.path.join(out_dir, 'page')
+        cmd = ['pdftoppm', '-png', '-r', str(dpi), '-f', '1', '-l', '1', '-singlefile', pdf_path, prefix]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            logger.error(f"pdftoppm failed with code {result.returncode}: {result.stderr.strip()[:200]}")
+            return None
+        with open(f"{prefix}.png", 'rb') as f:
+            return f.read()
+    except subprocess.TimeoutExpired:
+        logger.error(f"pdftoppm timed out after {timeout} seconds")
+        return None
+    except OSError as e:
+        logger.error(f"Error rasterizing preview: {str(e)}")
+        return None
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def convert_image(png_content, image_format, quality=80):
+    """Re-encode a PNG preview in another format. Returns None on failure."""
+    if image_format == 'png':
+        return png_content
+    if Image is None:
+        logger.error(f"Cannot encode {image_format} previews without Pillow")
+        return None
+    try:
+        with Image.open(io.BytesIO(png_content)) as image:
+            output = io.BytesIO()
+            image.save(output, format=image_format.upper(), quality=quality)
+            return output.getvalue()
+    except Exception as e:
+        logger.error(f"Error encoding {image_format} preview: {str(e)}")
+        return None
+
+
+class PreviewSequencer:
+    """Remembers the newest preview sequence number seen from each client.
+
+    Every keystroke sends a preview request; once a newer one has arrived the
+    older ones are dropped instead of compiled. Requests without a client id
+    are never superseded. The oldest clients are forgotten past max_clients.
+    """
+
+    def __init__(self, max_clients=10000):
+        self.max_clients = max_clients
+        self._latest = OrderedDict()
+        self._lock = threading.Lock()
+
+    def advance(self, client, seq):
+        """Record a new request. Returns False if a newer one was already seen."""
+        if not client or seq is None:
+            return True
+        with self._lock:
+            latest = self._latest.get(client)
+            if latest is not None and seq < latest:
+                return False
+            self._latest[client] = seq
+            self._latest.move_to_end(client)
+            while len(self._latest) > self.max_clients:
+                self._latest.popitem(last=False)
+        return True
+
+    def is_current(self, client, seq):
+        """False once a newer request from the same client has arrived"""
+        if not client or seq is None:
+            return True
+        with self._lock:
+            latest = self._latest.get(client)
+        return latest is None or seq >= latest
@@ -0,0 +1,270 @@
+import os
+import re
+import sys
+import time
+import uuid
+import pstats
+import cProfile
+import logging
+import threading
+import contextvars
+from datetime import datetime
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger('rizzume')
+
+CPROFILE = 'cprofile'
+SAMPLING = 'sampling'
+KINDS = (CPROFILE, SAMPLING)
+SUFFIXES = {CPROFILE: '.prof', SAMPLING: '.folded'}
+
+# Labels may carry client-chosen trace ids; keep file names to plain tokens
+_UNSAFE = re.compile(r'[^A-Za-z0-9._-]+')
+
+# Session of the request running in this context, if an admin asked to profile it
+_request_session = contextvars.ContextVar('rizzume_profile', default=None)
+
+
+class Session:
+    """One profile capture, written to out_dir when finished.
+
+    cProfile sessions profile each thread that does the session's work
+    (entered through profiled()) and merge the per-thread stats into one
+    .prof file for pstats or snakeviz. From Python 3.12 one cProfile sees
+    every thread but only one can be enabled per process, so there the first
+    thread's profiler covers the rest and may catch concurrent requests too.
+
+    Sampling sessions walk the stacks of those threads every `interval`
+    seconds, or of every thread with all_threads, and write collapsed stacks
+    (.folded) for flamegraph.pl or speedscope. Their overhead does not grow
+    with call depth, so they are the safer choice on a busy instance.
+    """
+
+    def __init__(self, kind, label, out_dir, interval=0.005, all_threads=False):
+        self.kind = kind
+        self.label = label
+        self.interval = interval
+        self.all_threads = all_threads
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # Unique even when two requests send the same trace id in the same second
+        name = f"{stamp}_{_UNSAFE.sub('_', label)[:80]}_{uuid.uuid4().hex[:8]}_{kind}{SUFFIXES[kind]}"
+        self.path = os.path.join(out_dir, name)
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+        self._entered = {}
+        self._holds = 0
+        self._closed = False
+        self._profiles = []
+        self._samples = Counter()
+        self._sample_count = 0
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self.started = time.time()
+        if self.kind == SAMPLING:
+            self._sampler = threading.Thread(target=self._sample_loop, name='profile-sampler', daemon=True)
+            self._sampler.start()
+
+    def enter(self):
+        """Start covering the calling thread. Nested calls are counted, not restarted."""
+        ident = threading.get_ident()
+        with self._lock:
+            if self.finished is not None:
+                return False
+            depth, profile = self._entered.get(ident, (0, None))
+            if depth == 0 and self.kind == CPROFILE:
+                profile = cProfile.Profile()
+            self._entered[ident] = (depth + 1, profile)
+        if depth == 0 and profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # 3.12+: another profiler is active and already sees this thread
+                with self._lock:
+                    self._entered[ident] = (1, None)
+        return True
+
+    def exit(self):
+        ident = threading.get_ident()
+        with self._lock:
+            depth, profile = self._entered.pop(ident)
+            if depth > 1:
+                self._entered[ident] = (depth - 1, profile)
+                return
+        if profile is not None:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def hold(self):
+        """Keep the session open past close() until a matching release()"""
+        with self._lock:
+            if self.finished is not None:
+                return False
+            self._holds += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._holds -= 1
+            last = self._holds == 0 and self._closed
+        if last:
+            self.finish()
+
+    def close(self):
+        """Finish now, or at the last release() if work handed off is still held"""
+        with self._lock:
+            self._closed = True
+            held = self._holds > 0
+        if not held:
+            self.finish()
+
+    def finish(self):
+        """Stop capturing and write the profile. Returns its path, or None if nothing was captured."""
+        with self._lock:
+            if self.finished is not None:
+                return self.path
+            self.finished = time.time()
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if self.kind == CPROFILE:
+            if not self._profiles:
+                return None
+            pstats.Stats(*self._profiles).dump_stats(self.path)
+        else:
+            if not self._samples:
+                return None
+            with open(self.path, 'w', encoding='utf-8') as f:
+                for stack, count in self._samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        logger.info(f"Wrote {self.kind} profile {self.path} ({self.finished - self.started:.2f}s)")
+        return self.path
+
+    def state(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "label": self.label,
+                "file": os.path.basename(self.path),
+                "started": self.started,
+                "finished": self.finished,
+                "samples": self._sample_count,
+                "profiled_threads": len(self._profiles),
+            }
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                watched = None if self.all_threads else set(self._entered)
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (watched is not None and ident not in watched):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                with self._lock:
+                    self._samples[';'.join(reversed(stack))] += 1
+                    self._sample_count += 1
+
+
+class Window:
+    """At most one time-window capture at a time, ended by a timer"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.session = None
+
+    def start(self, session, seconds):
+        """Begin session for `seconds`. Returns False if a capture is already running."""
+        with self._lock:
+            if self.session is not None and self.session.finished is None:
+                return False
+            self.session = session
+        session.start()
+        timer = threading.Timer(seconds, session.finish)
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def active(self):
+        session = self.session
+        return session if session is not None and session.finished is None else None
+
+    def state(self):
+        session = self.session
+        return session.state() if session else None
+
+
+window = Window()
+
+
+@contextmanager
+def request(session):
+    """Profile the request running in this context with session, then write it
+    (or, with follow(), once the work it queued is done)"""
+    if session is None:
+        yield
+        return
+    token = _request_session.set(session)
+    session.start()
+    try:
+        with profiled():
+            yield
+    finally:
+        _request_session.reset(token)
+        session.close()
+
+
+@contextmanager
+def profiled():
+    """Cover the calling thread with the current request's or window's session, if any.
+
+    Used around request handlers and job handlers; a job run for a profiled
+    request sees its session because the job queue runs handlers in the
+    submitting request's context.
+    """
+    session = _request_session.get() or window.active()
+    entered = session is not None and session.enter()
+    try:
+        yield
+    finally:
+        if entered:
+            session.exit()
+
+
+def follow(wait, timeout):
+    """Keep the current request's profile open until wait(timeout) returns.
+
+    For work a request queues without waiting for it (POST /jobs): the job
+    runs in the request's context, so profiled() in the job handler covers
+    it, and the profile is written once the job is done or timeout passes.
+    A job coalesced into an identical one already queued runs in that job's
+    context and is only covered if that request was profiled too.
+    """
+    session = _request_session.get()
+    if session is None or not session.hold():
+        return
+
+    def watch():
+        try:
+            wait(timeout)
+        finally:
+            session.release()
+    threading.Thread(target=watch, name='profile-follow', daemon=True).start()
+
+
+def list_profiles(out_dir):
+    """Profile files written so far, newest first"""
+    try:
+        names = [name for name in os.listdir(out_dir) if name.endswith(tuple(SUFFIXES.values()))]
+    except FileNotFoundError:
+        return []
+    return sorted(names, reverse=True)
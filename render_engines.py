@@ -0,0 +1,86 @@
+import shutil
+import logging
+import subprocess
+from functools import lru_cache
+
+try:
+    import weasyprint
+except ImportError:  # The HTML engine is optional; LaTeX engines need only TeX Live
+    weasyprint = None
+
+logger = logging.getLogger('rizzume')
+
+LATEX = 'latex'
+HTML = 'html'
+
+
+class LatexEngine:
+    """A TeX engine binary run on a .tex file; produces a PDF next to it.
+
+    Only pdflatex can load the dumped preamble formats and parked workers,
+    so other engines always compile the full document.
+    """
+
+    source_type = LATEX
+
+    def __init__(self, name, binary=None, supports_formats=False):
+        self.name = name
+        self.binary = binary or name
+        self.supports_formats = supports_formats
+
+    def available(self):
+        return shutil.which(self.binary) is not None
+
+    def version(self):
+        return _binary_version(self.binary)
+
+    def command(self, tex_path, output_dir, format_args=()):
+        return [
+            self.binary,
+            *format_args,
+            '-interaction=nonstopmode',
+            '-halt-on-error',
+            '-file-line-error',
+            f"-output-directory={output_dir}",
+            tex_path
+        ]
+
+
+class HtmlEngine:
+    """HTML/CSS to PDF in-process with WeasyPrint"""
+
+    source_type = HTML
+    supports_formats = False
+
+    def __init__(self, name='html', base_url=None):
+        self.name = name
+        self.base_url = base_url
+
+    def available(self):
+        return weasyprint is not None
+
+    def version(self):
+        return f"WeasyPrint {weasyprint.__version__}" if weasyprint else "Not available"
+
+    def render(self, html_content, output_path):
+        """Write the PDF for an HTML document to output_path. Returns True on success."""
+        if weasyprint is None:
+            logger.error("HTML engine requested but weasyprint is not installed")
+            return False
+        try:
+            weasyprint.HTML(string=html_content, base_url=self.base_url).write_pdf(output_path)
+            return True
+        except Exception as e:
+            logger.error(f"WeasyPrint failed: {str(e)}")
+            return False
+
+
+@lru_cache(maxsize=None)
+def _binary_version(binary):
+    """First line of `<binary> --version` (probed once per process)"""
+    try:
+        result = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=10)
+        return result.stdout.split('\n')[0] if result.returncode == 0 else "Not available"
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.error(f"Error getting {binary} version: {str(e)}")
+        return "Error"
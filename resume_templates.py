@@ -0,0 +1,116 @@
+import os
+import json
+import logging
+import jinja2
+from latex_format import PreambleFormat
+from render_engines import LATEX, HTML
+
+logger = logging.getLogger('rizzume')
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+PREAMBLE_FILE = 'preamble.tex'
+BODY_FILE = 'body.tex'
+HTML_FILE = 'body.html'
+MANIFEST_FILE = 'template.json'
+DEFAULT_ENGINES = {LATEX: 'pdflatex', HTML: 'html'}
+
+
+def latex_environment(template_dir):
+    """Jinja environment with delimiters that can't collide with LaTeX braces or #"""
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(template_dir),
+        block_start_string=r'\BLOCK{',
+        block_end_string='}',
+        variable_start_string=r'\VAR{',
+        variable_end_string='}',
+        comment_start_string=r'\#{',
+        comment_end_string='}',
+        trim_blocks=True,
+        lstrip_blocks=True,
+        keep_trailing_newline=True,
+        # Payload values are escaped for LaTeX before rendering
+        autoescape=False,
+        undefined=jinja2.StrictUndefined,
+        auto_reload=False
+    )
+
+
+def html_environment(template_dir):
+    """Jinja environment for HTML templates; values are HTML-escaped on output"""
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(template_dir),
+        autoescape=True,
+        undefined=jinja2.StrictUndefined,
+        auto_reload=False
+    )
+
+
+class ResumeTemplate:
+    """A named layout: a static preamble plus a compiled Jinja body.
+
+    For LaTeX templates only the body is templated, so every document rendered
+    from a template starts with the same preamble and can be compiled against
+    its dumped format. HTML templates have no preamble and no format.
+    """
+
+    def __init__(self, name, preamble, body, format_dir, source_type=LATEX, engine=None):
+        self.name = name
+        self.preamble = preamble
+        self.body = body
+        self.source_type = source_type
+        self.engine = engine or DEFAULT_ENGINES[source_type]
+        self.format = PreambleFormat(name, preamble, format_dir) if source_type == LATEX else None
+
+    def render(self, context):
+        return self.preamble + self.body.render(context)
+
+
+class TemplateRegistry:
+    """Loads and compiles every template under template_dir once, at startup.
+
+    Each subdirectory is a template named after the directory: preamble.tex
+    plus body.tex for LaTeX, or body.html for HTML. An optional template.json
+    sets {"engine": ...} to override the default engine for its source type.
+    """
+
+    def __init__(self, template_dir, format_dir):
+        self.template_dir = template_dir
+        self.environment = latex_environment(template_dir)
+        self.html_environment = html_environment(template_dir)
+        self._templates = {}
+        for name in sorted(os.listdir(template_dir)):
+            directory = os.path.join(template_dir, name)
+            manifest = {}
+            if os.path.isfile(os.path.join(directory, MANIFEST_FILE)):
+                with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            # Jinja template names always use forward slashes
+            if os.path.isfile(os.path.join(directory, PREAMBLE_FILE)):
+                with open(os.path.join(directory, PREAMBLE_FILE), 'r', encoding='utf-8') as f:
+                    preamble = f.read()
+                body = self.environment.get_template(f"{name}/{BODY_FILE}")
+                template = ResumeTemplate(name, preamble, body, format_dir, LATEX, manifest.get('engine'))
+            elif os.path.isfile(os.path.join(directory, HTML_FILE)):
+                body = self.html_environment.get_template(f"{name}/{HTML_FILE}")
+                template = ResumeTemplate(name, '', body, format_dir, HTML, manifest.get('engine'))
+            else:
+                continue
+            self._templates[name] = template
+        logger.info(f"Loaded resume templates: {', '.join(self._templates) or 'none'}")
+
+    def __iter__(self):
+        return iter(self._templates.values())
+
+    def names(self):
+        return list(self._templates)
+
+    def get(self, name):
+        """Return the named template, or None"""
+        return self._templates.get(name)
+
+    def format_for(self, latex_content):
+        """The PreambleFormat of the template latex_content was rendered from, or None"""
+        for template in self._templates.values():
+            if template.format and latex_content.startswith(template.preamble):
+                return template.format
+        return None
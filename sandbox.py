@@ -0,0 +1,296 @@
+import os
+import re
+import time
+import shutil
+import select
+import signal
+import tempfile
+import logging
+import subprocess
+from collections import namedtuple
+
+logger = logging.getLogger('rizzume')
+
+MB = 1024 * 1024
+
+POSIX = os.name == 'posix'
+# util-linux prlimit: sets the limits on itself, then execs the compile
+PRLIMIT = shutil.which('prlimit') if POSIX else None
+
+# Missing on Windows, where compiles only get their timeout and a plain kill
+_SIGKILL = getattr(signal, 'SIGKILL', None)
+_SIGXCPU = getattr(signal, 'SIGXCPU', None)
+_SIGXFSZ = getattr(signal, 'SIGXFSZ', None)
+# wait() reaps compiles itself where it can wait without reaping first
+_REAP_OWN = POSIX and hasattr(os, 'waitid') and hasattr(os, 'wait4')
+
+# Per-compile resource limits; 0 turns a limit off
+Limits = namedtuple('Limits', ['cpu_seconds', 'memory_bytes', 'open_files', 'output_bytes'])
+
+DEFAULT_LIMITS = Limits(
+    cpu_seconds=int(os.environ.get('COMPILE_CPU_SECONDS', 20)),
+    memory_bytes=int(os.environ.get('COMPILE_MEMORY_MB', 1024)) * MB,
+    open_files=int(os.environ.get('COMPILE_OPEN_FILES', 256)),
+    output_bytes=int(os.environ.get('COMPILE_OUTPUT_MB', 50)) * MB,
+)
+
+TIMEOUT = 'timeout'
+CPU_LIMIT = 'cpu_limit'
+MEMORY_LIMIT = 'memory_limit'
+OUTPUT_LIMIT = 'output_limit'
+OPEN_FILES_LIMIT = 'open_files_limit'
+KILLED = 'killed'
+
+MESSAGES = {
+    TIMEOUT: "PDF compile timed out",
+    CPU_LIMIT: "PDF compile exceeded its CPU time limit",
+    MEMORY_LIMIT: "PDF compile exceeded its memory limit",
+    OUTPUT_LIMIT: "PDF compile exceeded its output size limit",
+    OPEN_FILES_LIMIT: "PDF compile exceeded its open file limit",
+    KILLED: "PDF compile was killed, most likely because the server ran low on memory",
+}
+
+# Limits a document breaks by itself, whatever the load. A timeout or a kill
+# says more about the host, so those are reported as the server being busy.
+DOCUMENT_LIMITS = (CPU_LIMIT, MEMORY_LIMIT, OUTPUT_LIMIT, OPEN_FILES_LIMIT)
+
+# What kpathsea, a shell or a Python stand-in prints on stderr when a limit
+# rather than a bad document stopped it: a failed allocation or open, or a
+# child killed by SIGXCPU / SIGXFSZ.
+# stdout is not searched: it echoes the document around TeX errors.
+_OUT_OF_MEMORY = re.compile(r'memory exhausted|out of memory|Cannot allocate memory|MemoryError|bad_alloc')
+_TOO_MANY_FILES = re.compile(r'Too many open files')
+_CPU_TIME = re.compile(r'CPU time limit exceeded')
+_FILE_TOO_LARGE = re.compile(r'File too large|File size limit exceeded')
+
+
+def status(reason):
+    """HTTP status for a stopped compile: 422 for the document's own limits, else 503"""
+    return 422 if reason in DOCUMENT_LIMITS else 503
+
+
+class LimitExceeded(Exception):
+    """A compile was stopped for breaking one of its resource limits, or its timeout"""
+
+    def __init__(self, reason, detail=None):
+        super().__init__(MESSAGES[reason])
+        self.reason = reason
+        self.detail = detail
+
+    @property
+    def status(self):
+        return status(self.reason)
+
+    def to_dict(self):
+        return {"error": str(self), "reason": self.reason}
+
+
+_warned_unlimited = False
+
+
+def command(cmd, limits=DEFAULT_LIMITS):
+    """cmd wrapped in prlimit so it runs under limits.
+
+    The limits are applied by prlimit, which then execs cmd in the same
+    process, rather than by a preexec_fn: running Python between fork and
+    exec is unsafe in a process with threads, as this one has. The CPU hard
+    limit sits one second above the soft one: SIGXCPU at the soft limit stops
+    TeX, SIGKILL at the hard limit stops anything that ignores it. Without
+    prlimit on the PATH, cmd runs unlimited (apart from its timeout).
+    """
+    global _warned_unlimited
+    options = []
+    if limits.cpu_seconds:
+        options.append(f"--cpu={limits.cpu_seconds}:{limits.cpu_seconds + 1}")
+    if limits.memory_bytes:
+        options.append(f"--as={limits.memory_bytes}")
+    if limits.open_files:
+        options.append(f"--nofile={limits.open_files}")
+    if limits.output_bytes:
+        options.append(f"--fsize={limits.output_bytes}")
+    if not options:
+        return list(cmd)
+    if not PRLIMIT:
+        if not _warned_unlimited:
+            _warned_unlimited = True
+            logger.warning("prlimit not found, compiles run without resource limits")
+        return list(cmd)
+    return [PRLIMIT, *options, '--', *cmd]
+
+
+def spawn(cmd, limits=DEFAULT_LIMITS, **kwargs):
+    """Start cmd in a new session (so its own process group) under limits.
+
+    Where wait() reaps the process itself, output goes to unlinked temporary
+    files instead of pipes, so nothing has to be read while it runs.
+    """
+    kwargs.setdefault('stdin', subprocess.DEVNULL)
+    if not _REAP_OWN:
+        return subprocess.Popen(
+            command(cmd, limits),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            start_new_session=True,
+            **kwargs
+        )
+    output_files = (tempfile.TemporaryFile(), tempfile.TemporaryFile())
+    process = subprocess.Popen(
+        command(cmd, limits),
+        stdout=output_files[0],
+        stderr=output_files[1],
+        text=True,
+        start_new_session=True,
+        **kwargs
+    )
+    process.output_files = output_files
+    return process
+
+
+def kill_group(pid):
+    """SIGKILL a sandboxed process and anything it spawned (on Windows, just the process)"""
+    try:
+        if POSIX:
+            os.killpg(pid, signal.SIGKILL)
+        else:
+            os.kill(pid, signal.SIGTERM)
+    except OSError:
+        # Already gone
+        pass
+
+
+def violation(returncode, stderr, cpu_seconds=None, limits=DEFAULT_LIMITS):
+    """The limit a finished process broke, or None for an ordinary exit.
+
+    cpu_seconds is the CPU time the process used, where known. A SIGKILL is
+    the hard CPU limit only if that reached it; otherwise the kernel's OOM
+    killer or someone else sent it, and it is reported as KILLED.
+    """
+    if _SIGXCPU and returncode == -_SIGXCPU:
+        return CPU_LIMIT
+    if _SIGKILL and returncode == -_SIGKILL:
+        # The hard limit is cpu_seconds + 1; rusage can read a few ms under
+        # the point where the kernel enforced it, so allow some slack
+        if limits.cpu_seconds and cpu_seconds is not None and cpu_seconds >= limits.cpu_seconds + 0.5:
+            return CPU_LIMIT
+        return KILLED
+    if _SIGXFSZ and returncode == -_SIGXFSZ:
+        return OUTPUT_LIMIT
+    if returncode == 0 or not stderr:
+        return None
+    if _CPU_TIME.search(stderr):
+        return CPU_LIMIT
+    if _OUT_OF_MEMORY.search(stderr):
+        return MEMORY_LIMIT
+    if _TOO_MANY_FILES.search(stderr):
+        return OPEN_FILES_LIMIT
+    if _FILE_TOO_LARGE.search(stderr):
+        return OUTPUT_LIMIT
+    return None
+
+
+def _exited(pid, timeout):
+    """Block until pid exits or timeout passes, without reaping it.
+    Returns the os.waitid result, or None if it is still running."""
+    flags = os.WEXITED | os.WNOHANG | os.WNOWAIT
+    pidfd = None
+    if hasattr(os, 'pidfd_open'):
+        try:
+            pidfd = os.pidfd_open(pid)
+        except OSError:
+            pass
+    if pidfd is not None:
+        try:
+            select.select([pidfd], [], [], timeout)
+        finally:
+            os.close(pidfd)
+        return os.waitid(os.P_PID, pid, flags)
+    deadline = time.monotonic() + timeout
+    delay = 0.001
+    while True:
+        result = os.waitid(os.P_PID, pid, flags)
+        if result is not None or time.monotonic() >= deadline:
+            return result
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
+
+
+def _reap(process):
+    """Reap an exited process with os.wait4. Returns the CPU seconds it used."""
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _read_output(process):
+    """Return the (stdout, stderr) a spawned process wrote to its temporary files"""
+    output = []
+    for f in process.output_files:
+        f.seek(0)
+        output.append(f.read().decode('utf-8', errors='replace'))
+        f.close()
+    return tuple(output)
+
+
+def _feed(process, input):
+    if input is None or process.stdin is None:
+        return
+    try:
+        process.stdin.write(input)
+        process.stdin.close()
+    except BrokenPipeError:
+        pass
+
+
+def wait(process, timeout, input=None, limits=DEFAULT_LIMITS):
+    """Wait for a spawned process like subprocess.run would.
+
+    Returns a CompletedProcess for a normal exit, failed or not. Raises
+    LimitExceeded if the process broke a limit or ran past timeout seconds,
+    in which case its whole process group has been killed.
+
+    On POSIX the process is reaped here with os.wait4, which also reports the
+    CPU time it used, so a SIGKILL can be told apart from the hard CPU limit.
+    The group is killed before the leader is reaped, never after.
+    """
+    if not _REAP_OWN or process.returncode is not None:
+        return _communicate(process, timeout, input, limits)
+    _feed(process, input)
+    if _exited(process.pid, timeout) is None:
+        kill_group(process.pid)
+        _reap(process)
+        _read_output(process)
+        raise LimitExceeded(TIMEOUT, f"killed after {timeout}s")
+    # Until the exited leader is reaped its pid, and so the group id, cannot
+    # be reused, so this only reaches whatever it left running
+    kill_group(process.pid)
+    cpu_seconds = _reap(process)
+    stdout, stderr = _read_output(process)
+    reason = violation(process.returncode, stderr, cpu_seconds, limits)
+    if reason:
+        raise LimitExceeded(reason, f"exit code {process.returncode}")
+    return subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
+
+
+def _communicate(process, timeout, input, limits):
+    """wait() through Popen.communicate, where the CPU time is not available"""
+    try:
+        stdout, stderr = process.communicate(input=input, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_group(process.pid)
+        process.communicate()
+        raise LimitExceeded(TIMEOUT, f"killed after {timeout}s")
+    if not isinstance(stdout, str):
+        # Output went to temporary files (a process already reaped by poll())
+        stdout, stderr = _read_output(process)
+    # The process is reaped by now, so its pid may already belong to someone
+    # else: leftover children are not killed here, but they inherited the limits
+    reason = violation(process.returncode, stderr, None, limits)
+    if reason:
+        raise LimitExceeded(reason, f"exit code {process.returncode}")
+    return subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
+
+
+def run(cmd, timeout, limits=DEFAULT_LIMITS, **kwargs):
+    """subprocess.run for untrusted compiles: limits, own process group, group kill"""
+    return wait(spawn(cmd, limits, **kwargs), timeout, limits=limits)
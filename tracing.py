@@ -0,0 +1,137 @@
+import re
+import json
+import time
+import uuid
+import atexit
+import queue
+import logging
+import logging.handlers
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger('rizzume')
+# Finished spans, one JSON object per line; only written once configure() ran
+span_logger = logging.getLogger('rizzume.spans')
+span_logger.propagate = False
+
+TRACE_HEADER = 'X-Trace-Id'
+# W3C trace context: version-traceid-parentid-flags
+_TRACEPARENT = re.compile(r'[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}')
+# Client-chosen ids end up in files and headers, so only plain tokens are taken
+_TRACE_ID = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+# (trace id, id of the innermost open span or None) of the running request
+_current = contextvars.ContextVar('rizzume_trace', default=None)
+
+
+def configure(path, max_bytes=50 * 1024 * 1024, backups=2):
+    """Export spans to a size-capped rotating JSON-lines file at path.
+
+    Like the application log, records go through a queue to a background
+    listener so request threads never wait on the disk.
+    """
+    if not path or span_logger.handlers:
+        return
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    span_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(span_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    span_logger.addHandler(logging.handlers.QueueHandler(span_queue))
+    span_logger.setLevel(logging.INFO)
+    logger.info(f"Exporting trace spans to {path}")
+
+
+def enabled():
+    return bool(span_logger.handlers)
+
+
+def trace_id_from(headers):
+    """The caller's trace id (X-Trace-Id, else traceparent), or a new one"""
+    trace_id = headers.get(TRACE_HEADER, '')
+    if _TRACE_ID.fullmatch(trace_id):
+        return trace_id
+    match = _TRACEPARENT.fullmatch(headers.get('traceparent', '').strip())
+    if match:
+        return match.group(1)
+    return uuid.uuid4().hex
+
+
+def current():
+    """Opaque handle on the open span, for record() after the context is gone"""
+    return _current.get()
+
+
+def current_trace_id():
+    current_span = _current.get()
+    return current_span[0] if current_span else None
+
+
+@contextmanager
+def trace(trace_id):
+    """Make trace_id the trace of everything run in this context"""
+    token = _current.set((trace_id, None))
+    try:
+        yield trace_id
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time the enclosed block as a child of the open span, if there is a trace"""
+    parent = _current.get()
+    if parent is None or not span_logger.handlers:
+        yield
+        return
+    span_id = uuid.uuid4().hex[:16]
+    token = _current.set((parent[0], span_id))
+    started = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        attrs['error'] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        _export(parent, span_id, name, started, time.perf_counter() - start, attrs)
+
+
+def record(name, started, seconds, parent=None, **attrs):
+    """Export a span that was timed elsewhere; started is a time.time() value.
+
+    parent is a current() handle, for work that finishes after its request
+    context has gone (such as streaming the response).
+    """
+    parent = parent or _current.get()
+    if parent is None or not span_logger.handlers:
+        return
+    _export(parent, uuid.uuid4().hex[:16], name, started, seconds, attrs)
+
+
+def traced(name):
+    """Decorator running a function inside span(name)"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _export(parent, span_id, name, started, seconds, attrs):
+    span_logger.info(json.dumps({
+        "trace_id": parent[0],
+        "span_id": span_id,
+        "parent_id": parent[1],
+        "name": name,
+        "start": round(started, 6),
+        "duration_ms": round(seconds * 1000, 3),
+        "thread": threading.current_thread().name,
+        **attrs,
+    }, default=str))
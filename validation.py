@@ -0,0 +1,189 @@
+import os
+import re
+from collections import namedtuple
+from itertools import accumulate
+
+# Upper bounds on what a resume payload may contain. Anything past these is
+# rejected before rendering, so a pathological request costs microseconds
+# instead of a pdflatex run that grinds until its timeout.
+Limits = namedtuple('Limits', [
+    'max_request_bytes',    # raw request body
+    'max_entries',          # education, experience or project entries
+    'max_bullets',          # bullets per entry
+    'max_skill_categories',
+    'max_skills',           # skills per category
+    'max_field_chars',      # names, dates, titles, contact details
+    'max_bullet_chars',
+    'max_total_chars',      # all strings in the payload together
+])
+
+DEFAULT_LIMITS = Limits(
+    max_request_bytes=int(os.environ.get('MAX_REQUEST_BYTES', 512 * 1024)),
+    max_entries=int(os.environ.get('MAX_RESUME_ENTRIES', 60)),
+    max_bullets=int(os.environ.get('MAX_RESUME_BULLETS', 30)),
+    max_skill_categories=int(os.environ.get('MAX_SKILL_CATEGORIES', 20)),
+    max_skills=int(os.environ.get('MAX_SKILLS_PER_CATEGORY', 50)),
+    max_field_chars=int(os.environ.get('MAX_FIELD_CHARS', 300)),
+    max_bullet_chars=int(os.environ.get('MAX_BULLET_CHARS', 1500)),
+    max_total_chars=int(os.environ.get('MAX_RESUME_CHARS', 200_000)),
+)
+
+CONTACT_FIELDS = ('name', 'phone', 'email', 'linkedin', 'github', 'template', 'engine', 'optimize', 'fit')
+SECTION_FIELDS = {
+    'education': ('institution', 'location', 'degree', 'dates'),
+    'experience': ('position', 'dates', 'company', 'location'),
+    'projects': ('name', 'technologies', 'dates'),
+}
+# Numbers are accepted where text is expected; the escaper stringifies them
+SCALAR_TYPES = (str, int, float)
+
+
+class ValidationError(Exception):
+    """A payload the service refuses to render.
+
+    status is the HTTP status to answer with: 400 for malformed input, 413 when
+    the request as a whole is too big, 422 when a single part exceeds a limit.
+    field is the path of the offending value, e.g. "experience[2].bullets[0]".
+    reason labels the rejection in metrics; details are extra response fields.
+    """
+
+    def __init__(self, message, field=None, status=400, limit=None, reason=None, details=None):
+        super().__init__(message)
+        self.field = field
+        self.status = status
+        self.limit = limit
+        self.reason = reason or ('too_large' if status == 413 else 'invalid')
+        self.details = details or {}
+
+    def to_dict(self):
+        body = {"error": str(self)}
+        if self.field:
+            body["field"] = self.field
+        if self.limit is not None:
+            body["limit"] = self.limit
+        body.update(self.details)
+        return body
+
+
+class _Budget:
+    """Running total of payload characters, checked as fields are visited"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+
+    def spend(self, text, field):
+        self.used += len(text)
+        if self.used > self.limit:
+            raise ValidationError(f"Resume exceeds {self.limit} characters of text", field, 413, self.limit)
+
+
+def _text(value, field, max_chars, budget):
+    if value is None:
+        return
+    if isinstance(value, bool) or not isinstance(value, SCALAR_TYPES):
+        raise ValidationError(f"{field} must be a string", field)
+    if isinstance(value, str):
+        if len(value) > max_chars:
+            raise ValidationError(f"{field} is longer than {max_chars} characters", field, 422, max_chars)
+        budget.spend(value, field)
+
+
+def _list(value, field, max_items):
+    if not isinstance(value, list):
+        raise ValidationError(f"{field} must be a list", field)
+    if len(value) > max_items:
+        raise ValidationError(f"{field} has more than {max_items} items", field, 422, max_items)
+    return value
+
+
+def validate_request_size(content_length, limits=DEFAULT_LIMITS):
+    """Reject an oversized body from its Content-Length, before reading it"""
+    if content_length is not None and content_length > limits.max_request_bytes:
+        raise ValidationError(f"Request body is larger than {limits.max_request_bytes} bytes",
+                              status=413, limit=limits.max_request_bytes)
+
+
+def validate_resume(data, limits=DEFAULT_LIMITS):
+    """Check a parsed resume payload against the schema and limits.
+
+    Raises ValidationError for the first problem found. Unknown top-level keys
+    are ignored, as the renderer ignores them.
+    """
+    if not isinstance(data, dict):
+        raise ValidationError("Request body must be a JSON object")
+    budget = _Budget(limits.max_total_chars)
+
+    for field in CONTACT_FIELDS:
+        _text(data.get(field), field, limits.max_field_chars, budget)
+
+    for section, fields in SECTION_FIELDS.items():
+        entries = data.get(section)
+        if entries is None:
+            continue
+        for i, entry in enumerate(_list(entries, section, limits.max_entries)):
+            path = f"{section}[{i}]"
+            if not isinstance(entry, dict):
+                raise ValidationError(f"{path} must be an object", path)
+            for field in fields:
+                _text(entry.get(field), f"{path}.{field}", limits.max_field_chars, budget)
+            bullets = entry.get('bullets')
+            if bullets is None:
+                continue
+            for j, bullet in enumerate(_list(bullets, f"{path}.bullets", limits.max_bullets)):
+                _text(bullet, f"{path}.bullets[{j}]", limits.max_bullet_chars, budget)
+
+    skills = data.get('skills')
+    if skills is None:
+        return
+    if not isinstance(skills, dict):
+        raise ValidationError("skills must be an object of category: [skills]", 'skills')
+    if len(skills) > limits.max_skill_categories:
+        raise ValidationError(f"skills has more than {limits.max_skill_categories} categories",
+                              'skills', 422, limits.max_skill_categories)
+    for category, items in skills.items():
+        path = f"skills.{category}"
+        _text(category, path, limits.max_field_chars, budget)
+        for j, item in enumerate(_list(items, path, limits.max_skills)):
+            _text(item, f"{path}[{j}]", limits.max_field_chars, budget)
+
+
+# Primitives that reach outside the document: the filesystem, the shell, or
+# TeX's own tokenisation. The templates never use them and escaped payload
+# text cannot produce them, so seeing one means escaping was bypassed.
+FORBIDDEN_COMMANDS = frozenset([
+    'write', 'write18', 'immediate', 'openin', 'openout', 'read', 'readline',
+    'input', 'include', 'includeonly', 'InputIfFileExists', 'openany',
+    'catcode', 'csname', 'def', 'edef', 'gdef', 'xdef', 'let', 'futurelet',
+    'directlua', 'latelua', 'special', 'ShellEscape', 'pdfprimitive',
+])
+
+# Escaped backslashes, braces and percent signs, and comments: none of them
+# can open a group or start a control sequence
+_INERT = re.compile(r'\\[\\{}%]|%[^\n]*')
+_FORBIDDEN = re.compile(r'\\(' + '|'.join(sorted(FORBIDDEN_COMMANDS, key=len, reverse=True)) + r')(?![A-Za-z@])')
+_BRACES = re.compile(r'[{}]')
+_BRACE_DEPTH = {'{': 1, '}': -1}
+
+
+def lint_latex(source):
+    """Cheap structural check of generated LaTeX before it reaches pdflatex.
+
+    Returns a description of the first problem (unbalanced braces or a
+    forbidden control sequence), or None if the source looks compilable.
+    """
+    code = _INERT.sub(' ', source)
+    match = _FORBIDDEN.search(code)
+    if match:
+        return f"line {code.count(chr(10), 0, match.start()) + 1}: forbidden control sequence \\{match.group(1)}"
+    braces = _BRACES.findall(code)
+    depths = list(accumulate(map(_BRACE_DEPTH.__getitem__, braces)))
+    if depths and min(depths) < 0:
+        # Only on failure: find where the group count first went negative
+        position = _BRACES.finditer(code)
+        for brace, depth in zip(position, depths):
+            if depth < 0:
+                return f"line {code.count(chr(10), 0, brace.start()) + 1}: unmatched closing brace"
+    if depths and depths[-1]:
+        return f"{depths[-1]} unclosed brace{'s' if depths[-1] > 1 else ''} at end of document"
+    return None
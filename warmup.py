@@ -0,0 +1,95 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger('rizzume')
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+
+
+class Warmup:
+    """Runs the slow first-use steps of a new instance in the background.
+
+    Steps are (name, fn) pairs run once, in order, on a daemon thread; a step
+    that raises or returns False is logged as failed and the rest still run.
+    `ready()` turns True when every step has finished, so readiness probes
+    can keep traffic away until then. `started` is a time.monotonic() value
+    taken as early as possible in the process, which the reported cold start
+    time counts from.
+    """
+
+    def __init__(self, steps, started, on_finish=None):
+        self.steps = steps
+        self.started = started
+        self.on_finish = on_finish
+        self._lock = threading.Lock()
+        self._status = PENDING
+        self._results = {}
+        self._cold_start = None
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._status = RUNNING
+        self._thread = threading.Thread(target=self.run, name='startup-warmup', daemon=True)
+        self._thread.start()
+
+    def run(self):
+        for name, step in self.steps:
+            start = time.perf_counter()
+            try:
+                ok = step() is not False
+                error = None if ok else "step reported failure"
+            except Exception as e:
+                ok = False
+                error = str(e)
+            seconds = time.perf_counter() - start
+            if not ok:
+                logger.error(f"Warm-up step {name} failed after {seconds:.2f}s: {error}")
+            with self._lock:
+                self._results[name] = {"ok": ok, "seconds": round(seconds, 3), "error": error}
+        with self._lock:
+            self._status = DONE
+            self._cold_start = time.monotonic() - self.started
+            results = dict(self._results)
+        steps = ', '.join(f"{name} {result['seconds']:.2f}s" for name, result in results.items())
+        logger.info(f"Warm-up finished, cold start took {self._cold_start:.2f}s ({steps})")
+        if self.on_finish:
+            self.on_finish(self._cold_start, results)
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Block until warm-up has finished. Returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def ready(self):
+        return self._done.is_set()
+
+    def state(self):
+        with self._lock:
+            return {
+                "status": self._status,
+                "steps": dict(self._results),
+                "cold_start_seconds": round(self._cold_start, 3) if self._cold_start is not None else None,
+            }
+
+
+def process_started():
+    """time.monotonic() value at which this process started.
+
+    Read from /proc so interpreter startup and imports count towards cold
+    start; falls back to now where /proc is unavailable.
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the parenthesised command name; starttime is field 22
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        age = time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf('SC_CLK_TCK')
+        return time.monotonic() - max(age, 0.0)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.monotonic()
@@ -0,0 +1,243 @@
+import os
+import time
+import shutil
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger('rizzume')
+
+WORKSPACE_PREFIX = 'ws-'
+
+
+def default_scratch_root(fallback, min_bytes=0):
+    """RAM-backed /dev/shm when the host has it with min_bytes free, else `fallback` on disk.
+
+    Docker gives containers a 64 MB /dev/shm unless run with --shm-size, too
+    small for the scratch quota; compiles there would fail with ENOSPC.
+    """
+    shm = '/dev/shm'
+    if not (os.path.isdir(shm) and os.access(shm, os.W_OK)):
+        return fallback
+    try:
+        usage = os.statvfs(shm)
+    except OSError:
+        return fallback
+    if usage.f_bavail * usage.f_frsize < min_bytes:
+        return fallback
+    return os.path.join(shm, 'rizzume')
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _clear(path):
+    """Remove the contents of a directory but keep the directory itself"""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.unlink(entry.path)
+
+
+class WorkspacePool:
+    """Reusable scratch directories for compiles, ideally on tmpfs.
+
+    Released workspaces are emptied and handed out again instead of being
+    created and removed on every compile. Names embed the owning pid so the
+    janitor can tell workspaces leaked by dead worker processes from live ones.
+    """
+
+    def __init__(self, root, max_free=8):
+        self.root = root
+        self.max_free = max_free
+        self._free = deque()
+        self._in_use = set()
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._stats = {"created": 0, "reused": 0, "discarded": 0}
+
+    def acquire(self):
+        """Return an empty workspace directory owned by the caller"""
+        with self._lock:
+            path = self._free.pop() if self._free else None
+            if path is None:
+                self._counter += 1
+                path = os.path.join(self.root, f"{WORKSPACE_PREFIX}{os.getpid()}-{self._counter}")
+                self._stats["created"] += 1
+            else:
+                self._stats["reused"] += 1
+            self._in_use.add(path)
+        # Also recreates a free workspace the janitor of another process removed
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def release(self, path):
+        """Empty a workspace and keep it for reuse, or remove it if enough are free"""
+        with self._lock:
+            self._in_use.discard(path)
+            keep = len(self._free) < self.max_free
+        try:
+            if keep:
+                _clear(path)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError as e:
+            logger.error(f"Error clearing workspace {path}: {str(e)}")
+            shutil.rmtree(path, ignore_errors=True)
+            keep = False
+        with self._lock:
+            if keep:
+                self._free.append(path)
+            else:
+                self._stats["discarded"] += 1
+
+    def owns(self, path):
+        with self._lock:
+            return path in self._in_use or path in self._free
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_use"] = len(self._in_use)
+            stats["free"] = len(self._free)
+        stats["root"] = self.root
+        return stats
+
+
+class Janitor:
+    """Background sweeper for scratch and result space.
+
+    Each watched directory has a max file age; entries older than that are
+    removed. Workspace roots are swept for workspaces whose owning process has
+    died, or that are older than max_age without belonging to this process.
+    If the watched directories together exceed quota_bytes, the oldest
+    removable files go first until they fit; directories watched with
+    quota=False are swept by age only and neither count nor get evicted.
+    """
+
+    def __init__(self, interval, quota_bytes):
+        self.interval = interval
+        self.quota_bytes = quota_bytes
+        self._watched = []
+        self._thread = None
+        self._stats = {"runs": 0, "orphans_removed": 0, "stale_removed": 0, "quota_removed": 0}
+        self._lock = threading.Lock()
+
+    def watch_files(self, directory, max_age, quota=True):
+        """Delete files under directory older than max_age seconds"""
+        self._watched.append((directory, max_age, None, quota))
+
+    def watch_workspaces(self, pool, max_age):
+        """Delete orphaned workspaces under the pool's root"""
+        self._watched.append((pool.root, max_age, pool, True))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name='scratch-janitor', daemon=True)
+        self._thread.start()
+
+    def run_once(self):
+        now = time.time()
+        counts = {"orphans_removed": 0, "stale_removed": 0, "quota_removed": 0}
+        removable = []
+        total = 0
+        for directory, max_age, pool, quota in self._watched:
+            if not os.path.isdir(directory):
+                continue
+            if pool is not None:
+                total += self._sweep_workspaces(directory, max_age, pool, now, counts)
+                continue
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    path = os.path.join(root, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    if now - stat.st_mtime > max_age:
+                        if self._remove(path):
+                            counts["stale_removed"] += 1
+                        continue
+                    if quota:
+                        total += stat.st_size
+                        removable.append((stat.st_mtime, stat.st_size, path))
+
+        if total > self.quota_bytes:
+            for _, size, path in sorted(removable):
+                if total <= self.quota_bytes:
+                    break
+                if self._remove(path):
+                    total -= size
+                    counts["quota_removed"] += 1
+            if total > self.quota_bytes:
+                logger.warning(f"Scratch space still {total} bytes over quota after janitor run")
+
+        with self._lock:
+            self._stats["runs"] += 1
+            for key, value in counts.items():
+                self._stats[key] += value
+        if any(counts.values()):
+            logger.info(f"Scratch janitor: {counts}, {total} bytes in use")
+        return counts
+
+    def _sweep_workspaces(self, directory, max_age, pool, now, counts):
+        """Remove orphaned workspaces; returns bytes held by the ones kept"""
+        total = 0
+        own_pid = os.getpid()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False) or not entry.name.startswith(WORKSPACE_PREFIX):
+                    continue
+                try:
+                    pid = int(entry.name[len(WORKSPACE_PREFIX):].split('-', 1)[0])
+                    age = now - entry.stat().st_mtime
+                except (ValueError, OSError):
+                    continue
+                if pid == own_pid:
+                    orphan = not pool.owns(entry.path)
+                else:
+                    # Compiles time out long before max_age, so an old workspace
+                    # in another process is leaked even if that process lives
+                    orphan = not _pid_alive(pid) or age > max_age
+                if orphan:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    counts["orphans_removed"] += 1
+                    continue
+                for root, _, files in os.walk(entry.path):
+                    for filename in files:
+                        try:
+                            total += os.path.getsize(os.path.join(root, filename))
+                        except OSError:
+                            pass
+        return total
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["quota_bytes"] = self.quota_bytes
+        return stats
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Scratch janitor failed: {str(e)}")